@@ -0,0 +1,29 @@
+"""Concede ou revoga o acesso às rotas /api/admin.
+
+O papel fica no campo role do usuário e não é exposto por nenhuma rota da API.
+
+Uso:
+    python admin_role.py suporte@mx3network.com.br            # concede admin
+    python admin_role.py suporte@mx3network.com.br --revoke   # revoga
+"""
+import argparse
+import asyncio
+
+from repositories import get_user_repository
+
+async def set_admin(email: str, grant: bool = True) -> bool:
+    users = get_user_repository()
+    return await users.set_role(email, "admin" if grant else None)
+
+def main():
+    parser = argparse.ArgumentParser(description="Concede ou revoga o papel de administrador")
+    parser.add_argument("email", help="email do usuário cadastrado")
+    parser.add_argument("--revoke", action="store_true", help="remove o papel de administrador")
+    args = parser.parse_args()
+
+    if not asyncio.run(set_admin(args.email, grant=not args.revoke)):
+        raise SystemExit(f"Usuário {args.email} não encontrado")
+    print(f"Papel de administrador {'revogado de' if args.revoke else 'concedido a'} {args.email}")
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,10 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import hashlib
+import hmac
 import os
+import uuid
 
 # Security
 SECRET_KEY = os.environ.get("SECRET_KEY", "mx3network-secret-key-change-in-production")
@@ -13,6 +16,10 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30 * 24 * 60  # 30 days
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# Carrinho de visitante
+GUEST_CART_COOKIE = "mx3_guest_cart"
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -47,4 +54,29 @@ def verify_token(token: str):
         )
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    return verify_token(credentials.credentials)
\ No newline at end of file
+    return verify_token(credentials.credentials)
+
+async def get_current_user_optional(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> Optional[str]:
+    if credentials is None:
+        return None
+    return verify_token(credentials.credentials)
+
+def _sign(value: str) -> str:
+    return hmac.new(SECRET_KEY.encode(), value.encode(), hashlib.sha256).hexdigest()
+
+def create_guest_token() -> tuple:
+    """Gera id de visitante e o valor assinado do cookie"""
+    guest_id = str(uuid.uuid4())
+    return guest_id, f"{guest_id}.{_sign(guest_id)}"
+
+def verify_guest_token(token: Optional[str]) -> Optional[str]:
+    """Retorna o id de visitante se a assinatura do cookie for válida"""
+    if not token or "." not in token:
+        return None
+    guest_id, signature = token.rsplit(".", 1)
+    # Compara bytes: compare_digest com str rejeita caracteres não ASCII com TypeError
+    if not hmac.compare_digest(signature.encode(), _sign(guest_id).encode()):
+        return None
+    return guest_id
@@ -0,0 +1,74 @@
+"""Normaliza os dados de cliente de pedidos gravados antes da busca administrativa.
+
+Pedidos antigos podem ter cpf formatado, email com maiúsculas ou espaços e não
+ter search_terms, ficando fora dos filtros cpf/email e da busca por prefixo (q).
+Percorre os pedidos em lotes por id e grava só os campos que mudaram, então pode
+ser interrompido e executado de novo.
+
+Uso:
+    python backfill_orders.py              # aplica
+    python backfill_orders.py --dry-run    # só conta os pedidos a corrigir
+"""
+import argparse
+import asyncio
+
+from repositories import get_order_repository
+from utils import only_digits, order_search_terms
+
+BACKFILL_BATCH_SIZE = 500
+
+def normalized_fields(order: dict) -> dict:
+    """Campos do pedido que diferem do que a rota de criação grava hoje"""
+    cliente = order.get("cliente") or {}
+    fields = {}
+    if isinstance(cliente.get("cpf"), str):
+        cpf = only_digits(cliente["cpf"])
+        if cpf != cliente["cpf"]:
+            fields["cliente.cpf"] = cpf
+    email = cliente.get("email")
+    if isinstance(email, str):
+        email = email.strip().lower()
+        if email != cliente["email"]:
+            fields["cliente.email"] = email
+    terms = order_search_terms(cliente.get("nome"), email)
+    if order.get("search_terms") != terms:
+        fields["search_terms"] = terms
+    return fields
+
+async def backfill(orders=None, batch_size: int = BACKFILL_BATCH_SIZE, dry_run: bool = False) -> dict:
+    if orders is None:
+        orders = get_order_repository()
+    stats = {"scanned": 0, "updated": 0, "batches": 0}
+
+    after_id = None
+    while True:
+        batch = await orders.scan(after_id, batch_size)
+        if not batch:
+            break
+        after_id = batch[-1]["id"]
+        updates = []
+        for order in batch:
+            fields = normalized_fields(order)
+            if fields:
+                updates.append((order["id"], fields))
+        if not dry_run:
+            await orders.update_fields(updates)
+        stats["scanned"] += len(batch)
+        stats["updated"] += len(updates)
+        stats["batches"] += 1
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Normaliza cpf, email e termos de busca de pedidos antigos")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="só conta, sem gravar")
+    args = parser.parse_args()
+
+    stats = asyncio.run(backfill(batch_size=args.batch_size, dry_run=args.dry_run))
+    print(
+        f"{stats['scanned']} pedidos verificados, {stats['updated']} "
+        f"{'a corrigir' if args.dry_run else 'corrigidos'} em {stats['batches']} lotes"
+    )
+
+if __name__ == "__main__":
+    main()
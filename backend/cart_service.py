@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+from repositories import GUEST_PREFIX
+
+logger = logging.getLogger(__name__)
+
+GUEST_CART_TTL_DAYS = int(os.environ.get("GUEST_CART_TTL_DAYS", "7"))
+COMPACTION_INTERVAL_SECONDS = int(os.environ.get("CART_COMPACTION_INTERVAL_SECONDS", "3600"))
+COMPACTION_BATCH_SIZE = int(os.environ.get("CART_COMPACTION_BATCH_SIZE", "500"))
+EMPTY_CART_GRACE_MINUTES = 60
+
+_merge_stats = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+
+
+def guest_owner(guest_id: str) -> str:
+    return f"{GUEST_PREFIX}{guest_id}"
+
+
+async def merge_guest_cart(carts, guest_id: str, user_id: str) -> int:
+    """Move os itens do carrinho de visitante para o carrinho do usuário.
+
+    O carrinho de visitante é removido atomicamente e seus itens são somados ao
+    carrinho do usuário em uma única atualização. Retorna o número de itens
+    mesclados.
+    """
+    started = time.perf_counter()
+
+    guest_cart = await carts.take(guest_owner(guest_id))
+    guest_items = guest_cart.get("items", []) if guest_cart else []
+    if not guest_items:
+        return 0
+
+    try:
+        await carts.merge_items(user_id, guest_items)
+    except Exception:
+        # Devolve o carrinho de visitante para não perder os itens
+        await carts.restore(guest_cart)
+        raise
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    _merge_stats["count"] += 1
+    _merge_stats["total_ms"] += elapsed_ms
+    _merge_stats["max_ms"] = max(_merge_stats["max_ms"], elapsed_ms)
+    return len(guest_items)
+
+
+async def compact_carts(carts, batch_size: int = COMPACTION_BATCH_SIZE) -> int:
+    """Remove, em lotes, carrinhos vazios e carrinhos de visitante abandonados"""
+    now = datetime.utcnow()
+    empty_before = now - timedelta(minutes=EMPTY_CART_GRACE_MINUTES)
+    guest_before = now - timedelta(days=GUEST_CART_TTL_DAYS)
+
+    removed = 0
+    while True:
+        deleted = await carts.delete_stale(empty_before, guest_before, batch_size)
+        removed += deleted
+        if deleted < batch_size:
+            break
+        await asyncio.sleep(0)
+    return removed
+
+
+async def run_cart_compaction(carts, interval: int = COMPACTION_INTERVAL_SECONDS):
+    """Loop de compactação executado em segundo plano"""
+    while True:
+        try:
+            removed = await compact_carts(carts)
+            if removed:
+                logger.info("Compactação de carrinhos removeu %d documentos", removed)
+        except Exception:
+            logger.exception("Erro na compactação de carrinhos")
+        await asyncio.sleep(interval)
+
+
+async def get_cart_stats(carts) -> dict:
+    count = _merge_stats["count"]
+    return {
+        "carts": await carts.count(),
+        "guest_carts": await carts.count_guests(),
+        "merges": count,
+        "merge_avg_ms": round(_merge_stats["total_ms"] / count, 3) if count else 0.0,
+        "merge_max_ms": round(_merge_stats["max_ms"], 3),
+    }
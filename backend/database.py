@@ -1,26 +1,55 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
+from load_shedding import pool_monitor
 
 load_dotenv()
 
 # MongoDB connection
 mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
 db_name = os.environ.get('DB_NAME', 'mx3network_db')
+cart_ttl_days = int(os.environ.get('CART_TTL_DAYS', '30'))
 
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[pool_monitor])
 db = client[db_name]
 
 # Collections
 users_collection = db.users
 orders_collection = db.orders
 carts_collection = db.carts
+rate_limits_collection = db.rate_limits
+webhook_events_collection = db.webhook_events
+inventory_collection = db.inventory
+reservations_collection = db.reservations
+
+async def create_indexes(database):
+    """Create the indexes used by the repositories on the given database"""
+    await database.users.create_index("email", unique=True)
+    await database.users.create_index("cpf", unique=True)
+    await database.orders.create_index("id", unique=True)
+    await database.orders.create_index("user_id")
+    await database.orders.create_index("created_at")
+    # Busca administrativa: cada filtro de igualdade seguido da ordenação keyset
+    await database.orders.create_index([("created_at", -1), ("id", -1)])
+    await database.orders.create_index([("status", 1), ("created_at", -1), ("id", -1)])
+    await database.orders.create_index([("pagamento.tipo", 1), ("created_at", -1), ("id", -1)])
+    await database.orders.create_index([("cliente.cpf", 1), ("created_at", -1), ("id", -1)])
+    await database.orders.create_index([("cliente.email", 1), ("created_at", -1), ("id", -1)])
+    await database.orders.create_index([("search_terms", 1), ("created_at", -1), ("id", -1)])
+    # payment_id só existe após o pagamento; índice parcial evita entradas nulas
+    await database.orders.create_index(
+        [("payment_id", 1)],
+        partialFilterExpression={"payment_id": {"$gt": ""}}
+    )
+    await database.carts.create_index("user_id", unique=True)
+    # Carrinhos abandonados expiram automaticamente
+    await database.carts.create_index("updated_at", expireAfterSeconds=cart_ttl_days * 24 * 3600)
+    await database.rate_limits.create_index("expires_at", expireAfterSeconds=0)
+    await database.webhook_events.create_index([("processed_at", 1), ("received_at", 1)])
+    await database.inventory.create_index([("product_id", 1), ("slot", 1)])
+    await database.reservations.create_index("expires_at")
 
 async def init_database():
     """Initialize database indexes"""
     # Create indexes for better performance
-    await users_collection.create_index("email", unique=True)
-    await users_collection.create_index("cpf", unique=True)
-    await orders_collection.create_index("user_id")
-    await orders_collection.create_index("created_at")
-    await carts_collection.create_index("user_id", unique=True)
\ No newline at end of file
+    await create_indexes(db)
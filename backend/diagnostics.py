@@ -0,0 +1,214 @@
+import asyncio
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Optional
+from urllib.parse import parse_qs
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Ferramentas de diagnóstico ficam desligadas por padrão (produção)
+DEBUG_TOOLS_ENABLED = os.environ.get("DEBUG_TOOLS_ENABLED", "false").lower() == "true"
+DEBUG_TOKEN = os.environ.get("DEBUG_TOKEN", "")
+PROFILE_HEADER = b"x-profile-token"
+PROFILE_QUERY_PARAM = "__profile"
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000
+LOOP_LAG_THRESHOLD = float(os.environ.get("LOOP_LAG_THRESHOLD_MS", "100")) / 1000
+LOOP_MONITOR_INTERVAL = float(os.environ.get("LOOP_MONITOR_INTERVAL_MS", "50")) / 1000
+
+
+def is_authorized(token: Optional[str]) -> bool:
+    # Compara bytes: compare_digest com str rejeita caracteres não ASCII com TypeError
+    return bool(DEBUG_TOKEN) and token is not None and hmac.compare_digest(token.encode(), DEBUG_TOKEN.encode())
+
+
+def folded_stack(frame) -> str:
+    """Converte um frame no formato 'collapsed' (raiz primeiro, separado por ';')"""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class SamplingProfiler:
+    """Amostra periodicamente a pilha de uma thread em uma thread separada"""
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[folded_stack(frame)] += 1
+
+    def folded(self) -> str:
+        """Saída compatível com flamegraph.pl / speedscope"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class LoopMonitor:
+    """Mede o atraso do event loop e registra a pilha de callbacks que o bloqueiam"""
+
+    def __init__(self, threshold: float = LOOP_LAG_THRESHOLD, interval: float = LOOP_MONITOR_INTERVAL):
+        self.threshold = threshold
+        self.interval = interval
+        self.samples = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.smoothed_lag = 0.0
+        self.stalls = deque(maxlen=20)
+        self._last_beat = time.perf_counter()
+        self._reported = False
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self, watchdog: bool = True):
+        """Inicia a medição de atraso; o watchdog de pilhas é opcional"""
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._last_beat = time.perf_counter()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        if watchdog:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _heartbeat(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(0.0, now - started - self.interval)
+            self._last_beat = now
+            self._reported = False
+            self.samples += 1
+            self.last_lag = lag
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+            self.smoothed_lag += 0.2 * (lag - self.smoothed_lag)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            blocked = time.perf_counter() - self._last_beat - self.interval
+            if blocked < self.threshold or self._reported:
+                continue
+            self._reported = True
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = folded_stack(frame) if frame is not None else ""
+            self.stalls.append({
+                "at": time.time(),
+                "blocked_ms": round(blocked * 1000, 1),
+                "stack": stack,
+            })
+            logger.warning("Event loop bloqueado há %.0f ms: %s", blocked * 1000, stack)
+
+    def current_lag(self) -> float:
+        """Atraso suavizado medido pelo heartbeat.
+
+        Não soma o tempo desde o último heartbeat: quem chama roda no próprio
+        loop, então um bloqueio anterior já terminou, mas as requisições que
+        esperavam por ele rodam antes do heartbeat e veriam o bloqueio inteiro
+        como atraso atual. O bloqueio em andamento só é medido pelo watchdog.
+        """
+        if self._task is None:
+            return 0.0
+        return self.smoothed_lag
+
+    def stats(self) -> dict:
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "samples": self.samples,
+            "last_lag_ms": round(self.last_lag * 1000, 3),
+            "smoothed_lag_ms": round(self.smoothed_lag * 1000, 3),
+            "avg_lag_ms": round(self.total_lag / self.samples * 1000, 3) if self.samples else 0.0,
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "stalls": list(self.stalls),
+        }
+
+
+loop_monitor = LoopMonitor()
+
+
+class ProfilingMiddleware:
+    """Retorna o perfil de amostragem da requisição em vez da resposta quando autorizado.
+
+    Ativado pelo header X-Profile-Token ou pelo parâmetro ?__profile=<token>. Como o
+    event loop é compartilhado, o perfil inclui as requisições concorrentes.
+    """
+
+    def __init__(self, app: ASGIApp, enabled: bool = DEBUG_TOOLS_ENABLED):
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not self.enabled or scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 0
+
+        async def discard(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        profiler = SamplingProfiler(threading.get_ident())
+        profiler.start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            elapsed = time.perf_counter() - started
+            profiler.stop()
+
+        body = profiler.folded().encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"content-disposition", b'attachment; filename="profile.folded"'),
+                (b"x-profiled-status", str(status_code).encode()),
+                (b"x-profiled-duration-ms", f"{elapsed * 1000:.3f}".encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def _requested(self, scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return is_authorized(value.decode("latin-1"))
+        query = scope.get("query_string", b"")
+        if PROFILE_QUERY_PARAM.encode() not in query:
+            return False
+        token = parse_qs(query.decode("latin-1")).get(PROFILE_QUERY_PARAM, [None])[0]
+        return is_authorized(token)
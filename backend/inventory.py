@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from repositories import UNTRACKED
+from webhooks import ALLOWED_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+RESERVATION_TTL_MINUTES = int(os.environ.get("RESERVATION_TTL_MINUTES", "30"))
+RESERVATION_SWEEP_INTERVAL_SECONDS = int(os.environ.get("RESERVATION_SWEEP_INTERVAL_SECONDS", "60"))
+
+# Estados dos quais um pedido não pago pode ser cancelado para devolver o estoque
+CANCELLABLE_FROM = [s for s in ALLOWED_TRANSITIONS["cancelado"] if s != "pago"]
+
+
+async def reserve_items(inventory, items: List[dict]) -> Tuple[Optional[List[dict]], Optional[str]]:
+    """Reserva o estoque de todas as linhas do pedido.
+
+    Retorna (linhas reservadas, None) ou (None, produto sem saldo). Em falha
+    parcial, o que já foi decrementado é devolvido antes de retornar.
+    """
+    quantities: Dict[str, int] = defaultdict(int)
+    for item in items:
+        quantities[item["id"]] += item["quantity"]
+
+    reserved: List[dict] = []
+    for product_id in sorted(quantities):
+        lines = await inventory.reserve(product_id, quantities[product_id])
+        if lines is None:
+            await release_items(inventory, reserved)
+            return None, product_id
+        if lines != UNTRACKED:
+            # Um produto pode ter sido dividido entre vários shards
+            reserved += [
+                {"product_id": product_id, "shard_id": shard_id, "quantity": quantity}
+                for shard_id, quantity in lines
+            ]
+    return reserved, None
+
+
+async def release_items(inventory, lines: List[dict]):
+    for line in lines:
+        await inventory.release(line["shard_id"], line["quantity"])
+
+
+async def hold_reservation(inventory, order_id: str, lines: List[dict]):
+    """Registra a reserva do pedido pendente para expirar após o TTL"""
+    if not lines:
+        return
+    await inventory.save_reservation({
+        "_id": order_id,
+        "lines": lines,
+        "expires_at": datetime.utcnow() + timedelta(minutes=RESERVATION_TTL_MINUTES),
+    })
+
+
+async def cancel_unpaid(inventory, orders, order_id: str, lines: List[dict], now: Optional[datetime] = None) -> bool:
+    """Cancela um pedido não pago e devolve o estoque reservado.
+
+    O estoque só volta se o cancelamento foi aplicado ou o pedido já estava
+    cancelado; um pedido pago, ou que ainda pode ser pago, fica com as unidades.
+    """
+    cancelled = await orders.apply_transitions([{
+        "order_id": order_id,
+        "status": "cancelado",
+        "payment_id": None,
+        "allowed_from": CANCELLABLE_FROM,
+        "at": now or datetime.utcnow(),
+    }])
+    if not cancelled:
+        order = await orders.find_by_id(order_id)
+        if order and order["status"] != "cancelado":
+            return False
+    await release_items(inventory, lines)
+    return True
+
+
+async def expire_reservations(inventory, orders, limit: int = 500) -> int:
+    """Cancela pedidos não pagos com reserva vencida e devolve o estoque"""
+    now = datetime.utcnow()
+    expired = 0
+    while expired < limit:
+        reservation = await inventory.claim_expired(now)
+        if not reservation:
+            break
+        expired += 1
+        await cancel_unpaid(inventory, orders, reservation["_id"], reservation["lines"], now)
+    return expired
+
+
+async def run_reservation_sweeper(inventory, orders, interval: int = RESERVATION_SWEEP_INTERVAL_SECONDS):
+    """Loop em segundo plano que expira reservas vencidas"""
+    while True:
+        try:
+            expired = await expire_reservations(inventory, orders)
+            if expired:
+                logger.info("%d reservas de estoque expiradas", expired)
+        except Exception:
+            logger.exception("Erro ao expirar reservas de estoque")
+        await asyncio.sleep(interval)
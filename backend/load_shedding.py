@@ -0,0 +1,200 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict
+
+from pymongo import monitoring
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from diagnostics import loop_monitor
+
+# Limites de sobrecarga
+SHED_LOOP_LAG = float(os.environ.get("SHED_LOOP_LAG_MS", "200")) / 1000
+SHED_POOL_WAIT = float(os.environ.get("SHED_POOL_WAIT_MS", "100")) / 1000
+SHED_MAX_IN_FLIGHT = int(os.environ.get("SHED_MAX_IN_FLIGHT", "200"))
+SHED_ENABLED = os.environ.get("SHED_ENABLED", "true").lower() == "true"
+
+# Prioridades: consultas auxiliares são descartadas primeiro, checkout por último
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 1
+PRIORITY_HIGH = 2
+
+ROUTE_PRIORITIES = [
+    ("/api/utils/", PRIORITY_LOW),
+    ("/api/auth/validate-", PRIORITY_LOW),
+    ("/api/orders/create", PRIORITY_HIGH),
+    ("/api/webhooks/", PRIORITY_HIGH),
+]
+
+# Nível de sobrecarga (métrica / limite) a partir do qual cada prioridade é rejeitada
+SHED_LEVELS = {
+    PRIORITY_LOW: 1.0,
+    PRIORITY_NORMAL: 1.5,
+    PRIORITY_HIGH: 3.0,
+}
+
+# Rotas nunca rejeitadas (health checks do balanceador)
+EXEMPT_PATHS = ("/api/health", "/api/ready")
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Mede o tempo de espera por conexões do pool do pymongo"""
+
+    WINDOW = 5.0  # segundos sem eventos antes de zerar a média
+    ALPHA = 0.2
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.checked_out = 0
+        self.failures = 0
+        self.wait_avg = 0.0
+        self.wait_max = 0.0
+        self._last_event = 0.0
+
+    def current_wait(self) -> float:
+        if time.monotonic() - self._last_event > self.WINDOW:
+            return 0.0
+        return self.wait_avg
+
+    def _record_wait(self):
+        started = getattr(self._local, "started", None)
+        if started is None:
+            return
+        self._local.started = None
+        now = time.monotonic()
+        wait = now - started
+        self.wait_avg += self.ALPHA * (wait - self.wait_avg)
+        self.wait_max = max(self.wait_max, wait)
+        self._last_event = now
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.monotonic()
+        with self._lock:
+            self.waiting += 1
+
+    def connection_checked_out(self, event):
+        self._record_wait()
+        with self._lock:
+            self.waiting -= 1
+            self.checked_out += 1
+
+    def connection_check_out_failed(self, event):
+        self._record_wait()
+        with self._lock:
+            self.waiting -= 1
+            self.failures += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "waiting": self.waiting,
+            "checked_out": self.checked_out,
+            "checkout_failures": self.failures,
+            "wait_avg_ms": round(self.current_wait() * 1000, 3),
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+
+pool_monitor = PoolMonitor()
+
+
+class LoadState:
+    def __init__(self):
+        self.in_flight = 0
+        self.shed: Dict[int, int] = defaultdict(int)
+
+    def overload_level(self) -> float:
+        """Maior razão entre métrica observada e seu limite (>= 1 indica sobrecarga)"""
+        return max(
+            loop_monitor.current_lag() / SHED_LOOP_LAG,
+            pool_monitor.current_wait() / SHED_POOL_WAIT,
+            self.in_flight / SHED_MAX_IN_FLIGHT,
+        )
+
+    def readiness(self) -> dict:
+        level = self.overload_level()
+        return {
+            "ready": level < SHED_LEVELS[PRIORITY_LOW],
+            "overload_level": round(level, 3),
+            "loop_lag_ms": round(loop_monitor.current_lag() * 1000, 3),
+            "in_flight": self.in_flight,
+            "mongo_pool": pool_monitor.stats(),
+            "shed": {"low": self.shed[PRIORITY_LOW], "normal": self.shed[PRIORITY_NORMAL], "high": self.shed[PRIORITY_HIGH]},
+        }
+
+
+load_state = LoadState()
+
+
+def route_priority(path: str) -> int:
+    for prefix, priority in ROUTE_PRIORITIES:
+        if path.startswith(prefix):
+            return priority
+    return PRIORITY_NORMAL
+
+
+class LoadSheddingMiddleware:
+    """Conta requisições em andamento e rejeita as de menor prioridade sob sobrecarga"""
+
+    def __init__(self, app: ASGIApp, enabled: bool = SHED_ENABLED):
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if self.enabled and not path.startswith(EXEMPT_PATHS):
+            priority = route_priority(path)
+            if load_state.overload_level() >= SHED_LEVELS[priority]:
+                load_state.shed[priority] += 1
+                await self._reject(send)
+                return
+
+        load_state.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            load_state.in_flight -= 1
+
+    async def _reject(self, send: Send):
+        body = b'{"detail":"Servidor sobrecarregado. Tente novamente em instantes."}'
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", b"1"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
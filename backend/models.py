@@ -1,8 +1,21 @@
-from pydantic import BaseModel, Field, EmailStr, validator
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, EmailStr, TypeAdapter, validator
+from typing import List, Optional, Dict, Any, Type, TypeVar
 from datetime import datetime
+import os
 import uuid
-import re
+from utils import only_digits
+
+# Modo de orçamento de validação: documentos vindos do MongoDB já foram
+# validados na escrita e são hidratados sem nova validação
+TRUST_DB_DOCUMENTS = os.environ.get("TRUST_DB_DOCUMENTS", "true").lower() == "true"
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+def from_document(model: Type[ModelT], document: Dict[str, Any]) -> ModelT:
+    """Cria o modelo a partir de um documento confiável do banco"""
+    if TRUST_DB_DOCUMENTS:
+        return model.model_construct(**document)
+    return model(**document)
 
 # Modelos de Usuario
 class UserBase(BaseModel):
@@ -23,14 +36,14 @@ class UserCreate(UserBase):
     @validator('cpf')
     def validate_cpf_cnpj(cls, v):
         # Remove caracteres especiais
-        v = re.sub(r'[^0-9]', '', v)
+        v = only_digits(v)
         if len(v) not in [11, 14]:
             raise ValueError('CPF deve ter 11 dígitos ou CNPJ deve ter 14 dígitos')
         return v
     
     @validator('telefone')
     def validate_telefone(cls, v):
-        telefone_clean = re.sub(r'[^0-9]', '', v)
+        telefone_clean = only_digits(v)
         if len(telefone_clean) < 10:
             raise ValueError('Telefone deve ter pelo menos 10 dígitos')
         return v
@@ -53,7 +66,7 @@ class CartItem(BaseModel):
     id: str
     name: str
     price: float
-    quantity: int
+    quantity: int = Field(gt=0)
     image: str
 
 class Cart(BaseModel):
@@ -61,12 +74,24 @@ class Cart(BaseModel):
     items: List[CartItem] = []
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+# Adapter reutilizado para validar o corpo JSON do carrinho direto dos bytes
+cart_items_adapter = TypeAdapter(List[CartItem])
+
 # Modelos de Pedido
 class CustomerData(BaseModel):
     nome: str
     email: str
     telefone: str
     cpf: str
+    
+    # Formas canônicas usadas nos filtros exatos da busca administrativa
+    @validator('cpf')
+    def normalize_cpf(cls, v):
+        return only_digits(v)
+    
+    @validator('email')
+    def normalize_email(cls, v):
+        return v.strip().lower()
 
 class AddressData(BaseModel):
     cep: str
@@ -104,6 +129,11 @@ class Order(BaseModel):
     payment_id: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+# Modelos de Estoque
+class StockUpdate(BaseModel):
+    quantity: int = Field(ge=0)
+    shards: int = Field(1, ge=1, le=64)  # mais de um shard para produtos muito disputados
+
 # Modelos de Resposta
 class StatusResponse(BaseModel):
     success: bool
@@ -0,0 +1,206 @@
+import os
+import time
+import math
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from auth import verify_token
+
+# Configuração
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory")  # memory, mongo
+# Atrás de proxy reverso, deixe RATE_LIMIT_TRUST_PROXY=false só se o proxy não
+# adicionar X-Forwarded-For: todos os clientes chegam com o IP do proxy e dividem
+# o mesmo limite por IP. Com true, o IP do cliente é a entrada adicionada pelo
+# proxy confiável mais distante (RATE_LIMIT_TRUSTED_HOPS contadas da direita);
+# as entradas à esquerda vêm do cliente e podem ser forjadas.
+RATE_LIMIT_TRUST_PROXY = os.environ.get("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
+RATE_LIMIT_TRUSTED_HOPS = max(1, int(os.environ.get("RATE_LIMIT_TRUSTED_HOPS", "1")))
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    name: str
+    path_prefix: str
+    limit: int  # requisições permitidas por período
+    period: float  # segundos
+
+    @property
+    def interval(self) -> float:
+        return self.period / self.limit
+
+
+# Regras por rota (limites valem por IP e, se autenticado, por usuário)
+RULES: List[RateLimitRule] = [
+    RateLimitRule("login", "/api/auth/login", 10, 60),
+    RateLimitRule("register", "/api/auth/register", 5, 60),
+    RateLimitRule("validate_cpf", "/api/auth/validate-cpf", 30, 60),
+    RateLimitRule("validate_cnpj", "/api/auth/validate-cnpj", 10, 60),
+    RateLimitRule("cep", "/api/utils/cep", 30, 60),
+]
+
+
+class MemoryStore:
+    """Armazena o TAT (theoretical arrival time) do GCRA em memória do processo.
+
+    As chaves ficam em ordem de uso; cheio, o store descarta a usada há mais
+    tempo, então uma enxurrada de IPs novos não cresce a memória nem expulsa
+    quem está sendo limitado agora.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self._tat: "OrderedDict[str, float]" = OrderedDict()
+        self._max_keys = max_keys
+
+    async def hit(self, key: str, rule: RateLimitRule, now: float) -> float:
+        """Registra uma requisição; retorna 0 se permitida ou os segundos até liberar"""
+        tat = self._tat.get(key)
+        if tat is None:
+            if len(self._tat) >= self._max_keys:
+                self._tat.popitem(last=False)
+            tat = now
+        else:
+            self._tat.move_to_end(key)
+            if tat < now:
+                tat = now
+
+        new_tat = tat + rule.interval
+        if new_tat - now > rule.period:
+            self._tat[key] = tat
+            return new_tat - now - rule.period
+
+        self._tat[key] = new_tat
+        return 0.0
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+
+class MongoStore:
+    """GCRA compartilhado entre workers usando um documento por chave"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    async def hit(self, key: str, rule: RateLimitRule, now: float) -> float:
+        base = {"$max": [{"$ifNull": ["$tat", now]}, now]}
+        new_tat = {"$add": [base, rule.interval]}
+        # Atualização atômica: só avança o TAT se a requisição couber no período
+        previous = await self._collection.find_one_and_update(
+            {"_id": key},
+            [{"$set": {
+                "tat": {"$cond": [{"$lte": [new_tat, now + rule.period]}, new_tat, base]},
+                "expires_at": datetime.utcnow() + timedelta(seconds=rule.period),
+            }}],
+            upsert=True,
+            projection={"tat": 1},
+        )
+        tat = max(previous.get("tat", now) if previous else now, now)
+        excess = tat + rule.interval - now - rule.period
+        return excess if excess > 0 else 0.0
+
+
+class RateLimitMetrics:
+    def __init__(self):
+        self.allowed: Dict[str, int] = defaultdict(int)
+        self.rejected: Dict[str, int] = defaultdict(int)
+
+    def snapshot(self) -> dict:
+        return {
+            "allowed": dict(self.allowed),
+            "rejected": dict(self.rejected),
+        }
+
+
+metrics = RateLimitMetrics()
+
+
+def create_store():
+    if RATE_LIMIT_BACKEND == "mongo":
+        from database import rate_limits_collection
+        return MongoStore(rate_limits_collection)
+    return MemoryStore()
+
+
+def _match_rule(path: str) -> Optional[RateLimitRule]:
+    for rule in RULES:
+        if path.startswith(rule.path_prefix):
+            return rule
+    return None
+
+
+def _client_ip(scope: Scope, headers: Dict[bytes, bytes]) -> str:
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = headers.get(b"x-forwarded-for", b"").decode("latin-1")
+        entries = [entry.strip() for entry in forwarded.split(",") if entry.strip()]
+        if entries:
+            # Cada proxy confiável adiciona uma entrada à direita
+            return entries[-min(RATE_LIMIT_TRUSTED_HOPS, len(entries))]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _user_id(headers: Dict[bytes, bytes]) -> Optional[str]:
+    authorization = headers.get(b"authorization")
+    if not authorization or not authorization.lower().startswith(b"bearer "):
+        return None
+    try:
+        return verify_token(authorization[7:].decode("latin-1"))
+    except HTTPException:
+        return None
+
+
+class RateLimitMiddleware:
+    """Middleware ASGI que aplica RULES por IP, usuário e rota"""
+
+    def __init__(self, app: ASGIApp, store=None, enabled: bool = RATE_LIMIT_ENABLED):
+        self.app = app
+        self.store = store or create_store()
+        self.enabled = enabled
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rule = _match_rule(scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        keys = [f"ip:{_client_ip(scope, headers)}:{rule.name}"]
+        user_id = _user_id(headers)
+        if user_id:
+            keys.append(f"user:{user_id}:{rule.name}")
+
+        now = time.time()
+        retry_after = 0.0
+        for key in keys:
+            retry_after = max(retry_after, await self.store.hit(key, rule, now))
+
+        if retry_after > 0:
+            metrics.rejected[rule.name] += 1
+            await self._reject(send, retry_after)
+            return
+
+        metrics.allowed[rule.name] += 1
+        await self.app(scope, receive, send)
+
+    async def _reject(self, send: Send, retry_after: float):
+        body = b'{"detail":"Muitas requisi\\u00e7\\u00f5es. Tente novamente mais tarde."}'
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(retry_after)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
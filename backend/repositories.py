@@ -0,0 +1,833 @@
+import copy
+import os
+import random
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple, Union
+
+# Backend de armazenamento: mongo (Motor) ou memory (testes e benchmarks)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "mongo")
+
+# Produto sem documentos de estoque não tem controle de inventário
+UNTRACKED = "untracked"
+
+# Resultado de reserve: linhas (shard, quantidade), None sem saldo ou UNTRACKED
+Reservation = Union[List[Tuple[str, int]], str, None]
+
+# Carrinhos de visitante usam o mesmo campo user_id com prefixo próprio,
+# preservando o índice único e todas as consultas existentes
+GUEST_PREFIX = "guest:"
+
+
+class DuplicateError(Exception):
+    """Violação de índice único"""
+
+
+# Implementação MongoDB (Motor)
+
+class MotorUserRepository:
+    def __init__(self, collection):
+        self._collection = collection
+
+    async def find_by_email(self, email: str) -> Optional[dict]:
+        return await self._collection.find_one({"email": email}, {"_id": 0})
+
+    async def find_by_cpf(self, cpf: str) -> Optional[dict]:
+        return await self._collection.find_one({"cpf": cpf}, {"_id": 0})
+
+    async def find_by_id(self, user_id: str) -> Optional[dict]:
+        return await self._collection.find_one({"id": user_id}, {"_id": 0})
+
+    async def insert(self, user: dict):
+        from pymongo.errors import DuplicateKeyError
+        try:
+            await self._collection.insert_one(dict(user))
+        except DuplicateKeyError as e:
+            raise DuplicateError(str(e))
+
+    async def set_role(self, email: str, role: Optional[str]) -> bool:
+        """Define (ou remove, com None) o papel do usuário; False se não existir"""
+        update = {"$set": {"role": role}} if role else {"$unset": {"role": ""}}
+        result = await self._collection.update_one({"email": email}, update)
+        return result.matched_count > 0
+
+
+class MotorCartRepository:
+    def __init__(self, collection):
+        self._collection = collection
+
+    async def get(self, owner: str) -> Optional[dict]:
+        return await self._collection.find_one({"user_id": owner}, {"_id": 0})
+
+    async def replace(self, owner: str, cart: dict):
+        await self._collection.replace_one({"user_id": owner}, dict(cart), upsert=True)
+
+    async def delete(self, owner: str):
+        await self._collection.delete_one({"user_id": owner})
+
+    async def add_item(self, owner: str, item: dict):
+        """Soma a quantidade se o item já existir, senão adiciona a linha"""
+        from pymongo.errors import DuplicateKeyError
+        now = datetime.utcnow()
+        for _ in range(2):
+            result = await self._collection.update_one(
+                {"user_id": owner, "items.id": item["id"]},
+                {"$inc": {"items.$.quantity": item["quantity"]}, "$set": {"updated_at": now}}
+            )
+            if result.matched_count:
+                return
+            try:
+                await self._collection.update_one(
+                    {"user_id": owner, "items.id": {"$ne": item["id"]}},
+                    {"$push": {"items": item}, "$set": {"updated_at": now}},
+                    upsert=True
+                )
+                return
+            except DuplicateKeyError:
+                # Outra requisição inseriu o item entre as duas operações
+                continue
+
+    async def update_item(self, owner: str, item_id: str, quantity: int) -> bool:
+        """Atualiza ou remove (quantity <= 0) uma linha; retorna False se não existir"""
+        now = datetime.utcnow()
+        if quantity <= 0:
+            update = {"$pull": {"items": {"id": item_id}}, "$set": {"updated_at": now}}
+        else:
+            update = {"$set": {"items.$.quantity": quantity, "updated_at": now}}
+        result = await self._collection.update_one({"user_id": owner, "items.id": item_id}, update)
+        return result.matched_count > 0
+
+    async def take(self, owner: str) -> Optional[dict]:
+        """Remove e retorna o carrinho atomicamente"""
+        return await self._collection.find_one_and_delete({"user_id": owner}, {"_id": 0})
+
+    async def restore(self, cart: dict):
+        from pymongo.errors import DuplicateKeyError
+        try:
+            await self._collection.insert_one(dict(cart))
+        except DuplicateKeyError as e:
+            raise DuplicateError(str(e))
+
+    async def merge_items(self, owner: str, items: List[dict]):
+        """Soma itens ao carrinho em um único update com pipeline"""
+        incoming = {"$literal": items}
+        current = {"$ifNull": ["$items", []]}
+        incoming_quantity = {
+            "$sum": {
+                "$map": {
+                    "input": {"$filter": {"input": incoming, "as": "g", "cond": {"$eq": ["$$g.id", "$$it.id"]}}},
+                    "as": "g",
+                    "in": "$$g.quantity",
+                }
+            }
+        }
+        await self._collection.update_one(
+            {"user_id": owner},
+            [{"$set": {
+                "user_id": owner,
+                "updated_at": datetime.utcnow(),
+                "items": {"$concatArrays": [
+                    {"$map": {
+                        "input": current,
+                        "as": "it",
+                        "in": {"$mergeObjects": ["$$it", {"quantity": {"$add": ["$$it.quantity", incoming_quantity]}}]},
+                    }},
+                    {"$filter": {
+                        "input": incoming,
+                        "as": "g",
+                        "cond": {"$not": [{"$in": ["$$g.id", {"$map": {"input": current, "as": "c", "in": "$$c.id"}}]}]},
+                    }},
+                ]},
+            }}],
+            upsert=True
+        )
+
+    async def delete_stale(self, empty_before: datetime, guest_before: datetime, limit: int) -> int:
+        """Remove até `limit` carrinhos vazios ou de visitante abandonados"""
+        query = {"$or": [
+            {"items": {"$size": 0}, "updated_at": {"$lt": empty_before}},
+            {"user_id": {"$regex": f"^{GUEST_PREFIX}"}, "updated_at": {"$lt": guest_before}},
+        ]}
+        batch = await self._collection.find(query, {"_id": 1}).limit(limit).to_list(limit)
+        if not batch:
+            return 0
+        ids = [doc["_id"] for doc in batch]
+        result = await self._collection.delete_many({"$and": [query, {"_id": {"$in": ids}}]})
+        return result.deleted_count
+
+    async def count(self) -> int:
+        return await self._collection.estimated_document_count()
+
+    async def count_guests(self) -> int:
+        return await self._collection.count_documents({"user_id": {"$regex": f"^{GUEST_PREFIX}"}})
+
+
+class MotorOrderRepository:
+    def __init__(self, collection):
+        self._collection = collection
+
+    async def insert(self, order: dict):
+        from pymongo.errors import DuplicateKeyError
+        try:
+            await self._collection.insert_one(dict(order))
+        except DuplicateKeyError as e:
+            raise DuplicateError(str(e))
+
+    async def list_for_user(self, user_id: str, limit: int = 100) -> List[dict]:
+        cursor = self._collection.find({"user_id": user_id}, {"_id": 0}).sort("created_at", -1)
+        return await cursor.to_list(limit)
+
+    async def get_for_user(self, order_id: str, user_id: str) -> Optional[dict]:
+        return await self._collection.find_one({"id": order_id, "user_id": user_id}, {"_id": 0})
+
+    async def find_by_id(self, order_id: str) -> Optional[dict]:
+        return await self._collection.find_one({"id": order_id}, {"_id": 0})
+
+    async def set_status(self, order_id: str, status: str, payment_id: Optional[str] = None):
+        await self._collection.update_one(
+            {"id": order_id},
+            {"$set": {"status": status, "payment_id": payment_id}}
+        )
+
+    async def apply_transitions(self, transitions: List[dict]) -> int:
+        """Aplica mudanças de status em lote, cada uma condicionada ao status atual.
+
+        Cada transição tem order_id, status, payment_id e allowed_from. O bulk_write
+        é ordenado, então transições do mesmo pedido são avaliadas em sequência.
+        """
+        from pymongo import UpdateOne
+        if not transitions:
+            return 0
+        operations = [
+            UpdateOne(
+                {"id": t["order_id"], "status": {"$in": t["allowed_from"]}},
+                {"$set": {"status": t["status"], "payment_id": t["payment_id"], "updated_at": t["at"]}}
+            )
+            for t in transitions
+        ]
+        result = await self._collection.bulk_write(operations, ordered=True)
+        return result.modified_count
+
+    async def scan(self, after_id: Optional[str] = None, limit: int = 500) -> List[dict]:
+        """Lote de pedidos em ordem de id (índice único), para manutenção em lote"""
+        query = {"id": {"$gt": after_id}} if after_id else {}
+        cursor = self._collection.find(query, {"_id": 0}).sort("id", 1)
+        return await cursor.to_list(limit)
+
+    async def update_fields(self, updates: List[Tuple[str, dict]]) -> int:
+        """Aplica um $set por pedido em um único bulk_write; aceita campos com ponto"""
+        from pymongo import UpdateOne
+        if not updates:
+            return 0
+        operations = [UpdateOne({"id": order_id}, {"$set": fields}) for order_id, fields in updates]
+        result = await self._collection.bulk_write(operations, ordered=False)
+        return result.modified_count
+
+    async def search(
+        self,
+        filters: dict,
+        limit: int = 50,
+        after: Optional[Tuple[datetime, str]] = None,
+        ascending: bool = False
+    ) -> List[dict]:
+        """Busca administrativa ordenada por (created_at, id) com paginação keyset"""
+        direction = 1 if ascending else -1
+        cursor = self._collection.find(
+            order_search_query(filters, after, ascending),
+            {"_id": 0, "search_terms": 0}
+        ).sort([("created_at", direction), ("id", direction)])
+        return await cursor.to_list(limit)
+
+    async def explain_search(
+        self,
+        filters: dict,
+        after: Optional[Tuple[datetime, str]] = None,
+        ascending: bool = False
+    ) -> dict:
+        """Plano vencedor da busca, para verificar o uso de índices"""
+        direction = 1 if ascending else -1
+        cursor = self._collection.find(order_search_query(filters, after, ascending)).sort(
+            [("created_at", direction), ("id", direction)]
+        )
+        return await cursor.explain()
+
+
+class MotorInventoryRepository:
+    """Estoque em documentos por shard: {_id: "<produto>:<n>", product_id, slot, quantity}.
+
+    Produtos muito disputados podem ter vários shards; cada reserva escolhe um
+    shard a partir de um ponto aleatório, espalhando as escritas concorrentes.
+    """
+
+    def __init__(self, collection, reservations):
+        self._collection = collection
+        self._reservations = reservations
+
+    async def set_stock(self, product_id: str, quantity: int, shards: int = 1):
+        """Atualiza os shards no lugar, sem janela em que o produto some.
+
+        Shards excedentes de uma contagem anterior são removidos; devoluções de
+        reservas feitas neles caem em outro shard do produto (ver release).
+        """
+        from pymongo import DeleteMany, UpdateOne
+        base, extra = divmod(quantity, shards)
+        ids = [f"{product_id}:{n}" for n in range(shards)]
+        operations = [
+            UpdateOne(
+                {"_id": shard_id},
+                {"$set": {
+                    "product_id": product_id,
+                    "slot": n / shards,
+                    "quantity": base + (1 if n < extra else 0),
+                }},
+                upsert=True
+            )
+            for n, shard_id in enumerate(ids)
+        ]
+        operations.append(DeleteMany({"product_id": product_id, "_id": {"$nin": ids}}))
+        await self._collection.bulk_write(operations)
+
+    async def get_stock(self, product_id: str) -> Optional[int]:
+        shards = await self._collection.find({"product_id": product_id}, {"quantity": 1}).to_list(None)
+        if not shards:
+            return None
+        return sum(doc["quantity"] for doc in shards)
+
+    async def reserve(self, product_id: str, quantity: int) -> Reservation:
+        """Decrementa atomicamente se houver saldo; retorna [(shard, quantidade)], None ou UNTRACKED.
+
+        Primeiro tenta um shard com o saldo todo; se nenhum tiver, divide a
+        quantidade entre shards com decrementos condicionais e desfaz tudo se faltar.
+        """
+        start = random.random()
+        for slot_filter, direction in (({"$gte": start}, 1), ({"$lt": start}, -1)):
+            shard = await self._collection.find_one_and_update(
+                {"product_id": product_id, "slot": slot_filter, "quantity": {"$gte": quantity}},
+                {"$inc": {"quantity": -quantity}},
+                sort=[("slot", direction)],
+                projection={"_id": 1}
+            )
+            if shard:
+                return [(shard["_id"], quantity)]
+
+        shards = await self._collection.find({"product_id": product_id}, {"slot": 1, "quantity": 1}).to_list(None)
+        if not shards:
+            return UNTRACKED
+        if sum(shard["quantity"] for shard in shards) < quantity:
+            return None
+
+        shards.sort(key=lambda shard: (shard["slot"] < start, shard["slot"]))
+        taken: List[Tuple[str, int]] = []
+        remaining = quantity
+        for shard in shards:
+            available = shard["quantity"]
+            while remaining and available > 0:
+                take = min(available, remaining)
+                result = await self._collection.update_one(
+                    {"_id": shard["_id"], "quantity": {"$gte": take}},
+                    {"$inc": {"quantity": -take}}
+                )
+                if result.modified_count:
+                    taken.append((shard["_id"], take))
+                    remaining -= take
+                    break
+                # Outra reserva levou parte do saldo: relê e tenta com o que sobrou
+                current = await self._collection.find_one({"_id": shard["_id"]}, {"quantity": 1})
+                available = current["quantity"] if current else 0
+            if not remaining:
+                return taken
+
+        for shard_id, take in taken:
+            await self.release(shard_id, take)
+        return None
+
+    async def release(self, shard_id: str, quantity: int):
+        result = await self._collection.update_one({"_id": shard_id}, {"$inc": {"quantity": quantity}})
+        if not result.matched_count:
+            # Shard removido por set_stock com menos shards: devolve a outro do produto
+            product_id = shard_id.rsplit(":", 1)[0]
+            await self._collection.update_one({"product_id": product_id}, {"$inc": {"quantity": quantity}})
+
+    async def save_reservation(self, reservation: dict):
+        await self._reservations.insert_one(dict(reservation))
+
+    async def complete_reservation(self, order_id: str):
+        """Pedido pago: o estoque reservado passa a ser definitivo"""
+        await self._reservations.delete_one({"_id": order_id})
+
+    async def claim_expired(self, now: datetime) -> Optional[dict]:
+        return await self._reservations.find_one_and_delete({"expires_at": {"$lt": now}})
+
+
+# Campos de filtro da busca administrativa de pedidos
+ORDER_SEARCH_FIELDS = {
+    "status": "status",
+    "payment_type": "pagamento.tipo",
+    "cpf": "cliente.cpf",
+    "email": "cliente.email",
+    "payment_id": "payment_id",
+}
+
+
+def order_search_query(
+    filters: dict,
+    after: Optional[Tuple[datetime, str]] = None,
+    ascending: bool = False
+) -> dict:
+    """Monta a consulta da busca administrativa (igualdade, intervalo, prefixo e keyset)"""
+    query: Dict = {}
+    for name, field in ORDER_SEARCH_FIELDS.items():
+        if filters.get(name):
+            query[field] = filters[name]
+    if filters.get("prefix"):
+        # Regex ancorada sobre termo normalizado usa limites de índice
+        query["search_terms"] = {"$regex": f"^{re.escape(filters['prefix'])}"}
+
+    created = {}
+    if filters.get("created_from"):
+        created["$gte"] = filters["created_from"]
+    if filters.get("created_to"):
+        created["$lt"] = filters["created_to"]
+    if created:
+        query["created_at"] = created
+
+    if after:
+        op = "$gt" if ascending else "$lt"
+        created_at, order_id = after
+        keyset = {"$or": [
+            {"created_at": {op: created_at}},
+            {"created_at": created_at, "id": {op: order_id}},
+        ]}
+        query = {"$and": [query, keyset]} if query else keyset
+    return query
+
+
+class MotorWebhookEventRepository:
+    def __init__(self, collection):
+        self._collection = collection
+
+    async def insert(self, event: dict) -> bool:
+        """Registra a notificação; retorna False se o _id já existir (duplicada)"""
+        from pymongo.errors import DuplicateKeyError
+        try:
+            await self._collection.insert_one(dict(event))
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def mark_processed(self, event_ids: List[str], at: datetime):
+        await self._collection.update_many({"_id": {"$in": event_ids}}, {"$set": {"processed_at": at}})
+
+    async def list_events(
+        self,
+        provider: Optional[str] = None,
+        since: Optional[datetime] = None,
+        only_unprocessed: bool = True,
+        limit: int = 1000
+    ) -> List[dict]:
+        query: Dict = {}
+        if only_unprocessed:
+            query["processed_at"] = None
+        if provider:
+            query["provider"] = provider
+        if since:
+            query["received_at"] = {"$gte": since}
+        cursor = self._collection.find(query).sort("received_at", 1)
+        return await cursor.to_list(limit)
+
+
+# Implementação em memória
+#
+# Cada método executa sem pontos de await na parte crítica, então é atômico no
+# event loop, como uma operação de documento único no MongoDB. Documentos são
+# copiados na entrada e na saída para reproduzir o isolamento do banco.
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Datas com fuso viram UTC sem fuso, como o pymongo faz ao gravar e comparar"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class MemoryUserRepository:
+    def __init__(self):
+        self._docs: Dict[str, dict] = {}
+
+    def _find(self, field: str, value) -> Optional[dict]:
+        doc = next((d for d in self._docs.values() if d.get(field) == value), None)
+        return copy.deepcopy(doc) if doc else None
+
+    async def find_by_email(self, email: str) -> Optional[dict]:
+        return self._find("email", email)
+
+    async def find_by_cpf(self, cpf: str) -> Optional[dict]:
+        return self._find("cpf", cpf)
+
+    async def find_by_id(self, user_id: str) -> Optional[dict]:
+        doc = self._docs.get(user_id)
+        return copy.deepcopy(doc) if doc else None
+
+    async def insert(self, user: dict):
+        for field in ("email", "cpf"):
+            if any(d.get(field) == user.get(field) for d in self._docs.values()):
+                raise DuplicateError(f"{field} duplicado")
+        if user["id"] in self._docs:
+            raise DuplicateError("id duplicado")
+        self._docs[user["id"]] = copy.deepcopy(user)
+
+    async def set_role(self, email: str, role: Optional[str]) -> bool:
+        user = next((d for d in self._docs.values() if d.get("email") == email), None)
+        if not user:
+            return False
+        if role:
+            user["role"] = role
+        else:
+            user.pop("role", None)
+        return True
+
+
+class MemoryCartRepository:
+    def __init__(self):
+        self._docs: Dict[str, dict] = {}
+
+    async def get(self, owner: str) -> Optional[dict]:
+        doc = self._docs.get(owner)
+        return copy.deepcopy(doc) if doc else None
+
+    async def replace(self, owner: str, cart: dict):
+        self._docs[owner] = copy.deepcopy(cart)
+
+    async def delete(self, owner: str):
+        self._docs.pop(owner, None)
+
+    async def add_item(self, owner: str, item: dict):
+        now = datetime.utcnow()
+        cart = self._docs.setdefault(owner, {"user_id": owner, "items": []})
+        cart["updated_at"] = now
+        for line in cart["items"]:
+            if line["id"] == item["id"]:
+                line["quantity"] += item["quantity"]
+                return
+        cart["items"].append(copy.deepcopy(item))
+
+    async def update_item(self, owner: str, item_id: str, quantity: int) -> bool:
+        cart = self._docs.get(owner)
+        if not cart:
+            return False
+        for line in cart["items"]:
+            if line["id"] == item_id:
+                if quantity <= 0:
+                    cart["items"] = [i for i in cart["items"] if i["id"] != item_id]
+                else:
+                    line["quantity"] = quantity
+                cart["updated_at"] = datetime.utcnow()
+                return True
+        return False
+
+    async def take(self, owner: str) -> Optional[dict]:
+        return self._docs.pop(owner, None)
+
+    async def restore(self, cart: dict):
+        if cart["user_id"] in self._docs:
+            raise DuplicateError("user_id duplicado")
+        self._docs[cart["user_id"]] = copy.deepcopy(cart)
+
+    async def merge_items(self, owner: str, items: List[dict]):
+        cart = self._docs.setdefault(owner, {"user_id": owner, "items": []})
+        cart["updated_at"] = datetime.utcnow()
+        lines = {line["id"]: line for line in cart["items"]}
+        for item in items:
+            if item["id"] in lines:
+                lines[item["id"]]["quantity"] += item["quantity"]
+            else:
+                cart["items"].append(copy.deepcopy(item))
+
+    async def delete_stale(self, empty_before: datetime, guest_before: datetime, limit: int) -> int:
+        stale = [
+            owner for owner, cart in self._docs.items()
+            if (not cart.get("items") and cart["updated_at"] < empty_before)
+            or (owner.startswith(GUEST_PREFIX) and cart["updated_at"] < guest_before)
+        ][:limit]
+        for owner in stale:
+            del self._docs[owner]
+        return len(stale)
+
+    async def count(self) -> int:
+        return len(self._docs)
+
+    async def count_guests(self) -> int:
+        return sum(1 for owner in self._docs if owner.startswith(GUEST_PREFIX))
+
+
+class MemoryOrderRepository:
+    def __init__(self):
+        self._docs: Dict[str, dict] = {}
+
+    async def insert(self, order: dict):
+        if order["id"] in self._docs:
+            raise DuplicateError("id duplicado")
+        self._docs[order["id"]] = copy.deepcopy(order)
+
+    async def list_for_user(self, user_id: str, limit: int = 100) -> List[dict]:
+        orders = [o for o in self._docs.values() if o["user_id"] == user_id]
+        orders.sort(key=lambda o: o["created_at"], reverse=True)
+        return copy.deepcopy(orders[:limit])
+
+    async def get_for_user(self, order_id: str, user_id: str) -> Optional[dict]:
+        order = self._docs.get(order_id)
+        if not order or order["user_id"] != user_id:
+            return None
+        return copy.deepcopy(order)
+
+    async def find_by_id(self, order_id: str) -> Optional[dict]:
+        order = self._docs.get(order_id)
+        return copy.deepcopy(order) if order else None
+
+    async def set_status(self, order_id: str, status: str, payment_id: Optional[str] = None):
+        order = self._docs.get(order_id)
+        if order:
+            order["status"] = status
+            order["payment_id"] = payment_id
+
+    async def apply_transitions(self, transitions: List[dict]) -> int:
+        modified = 0
+        for t in transitions:
+            order = self._docs.get(t["order_id"])
+            if order and order["status"] in t["allowed_from"]:
+                order["status"] = t["status"]
+                order["payment_id"] = t["payment_id"]
+                order["updated_at"] = t["at"]
+                modified += 1
+        return modified
+
+    async def scan(self, after_id: Optional[str] = None, limit: int = 500) -> List[dict]:
+        ids = sorted(i for i in self._docs if after_id is None or i > after_id)
+        return copy.deepcopy([self._docs[i] for i in ids[:limit]])
+
+    async def update_fields(self, updates: List[Tuple[str, dict]]) -> int:
+        modified = 0
+        for order_id, fields in updates:
+            order = self._docs.get(order_id)
+            if not order:
+                continue
+            for path, value in fields.items():
+                *parents, name = path.split(".")
+                target = order
+                for part in parents:
+                    target = target.setdefault(part, {})
+                target[name] = value
+            modified += 1
+        return modified
+
+    async def search(
+        self,
+        filters: dict,
+        limit: int = 50,
+        after: Optional[Tuple[datetime, str]] = None,
+        ascending: bool = False
+    ) -> List[dict]:
+        created_from = _utc(filters.get("created_from"))
+        created_to = _utc(filters.get("created_to"))
+        if after:
+            after = (_utc(after[0]), after[1])
+
+        def matches(order: dict) -> bool:
+            for name, field in ORDER_SEARCH_FIELDS.items():
+                if filters.get(name):
+                    value = order
+                    for part in field.split("."):
+                        value = (value or {}).get(part)
+                    if value != filters[name]:
+                        return False
+            prefix = filters.get("prefix")
+            if prefix and not any(t.startswith(prefix) for t in order.get("search_terms", [])):
+                return False
+            if created_from and order["created_at"] < created_from:
+                return False
+            if created_to and order["created_at"] >= created_to:
+                return False
+            if after:
+                key = (order["created_at"], order["id"])
+                if (key <= after) if ascending else (key >= after):
+                    return False
+            return True
+
+        orders = [o for o in self._docs.values() if matches(o)]
+        orders.sort(key=lambda o: (o["created_at"], o["id"]), reverse=not ascending)
+        return [
+            {k: v for k, v in copy.deepcopy(o).items() if k != "search_terms"}
+            for o in orders[:limit]
+        ]
+
+
+class MemoryInventoryRepository:
+    def __init__(self):
+        self._shards: Dict[str, Dict[str, dict]] = {}
+        self._reservations: Dict[str, dict] = {}
+
+    async def set_stock(self, product_id: str, quantity: int, shards: int = 1):
+        base, extra = divmod(quantity, shards)
+        self._shards[product_id] = {
+            f"{product_id}:{n}": {"slot": n / shards, "quantity": base + (1 if n < extra else 0)}
+            for n in range(shards)
+        }
+
+    async def get_stock(self, product_id: str) -> Optional[int]:
+        shards = self._shards.get(product_id)
+        if not shards:
+            return None
+        return sum(shard["quantity"] for shard in shards.values())
+
+    async def reserve(self, product_id: str, quantity: int) -> Reservation:
+        shards = self._shards.get(product_id)
+        if not shards:
+            return UNTRACKED
+        start = random.random()
+        ordered = sorted(shards.items(), key=lambda kv: (kv[1]["slot"] < start, kv[1]["slot"]))
+        for shard_id, shard in ordered:
+            if shard["quantity"] >= quantity:
+                shard["quantity"] -= quantity
+                return [(shard_id, quantity)]
+        if sum(shard["quantity"] for shard in shards.values()) < quantity:
+            return None
+
+        taken: List[Tuple[str, int]] = []
+        remaining = quantity
+        for shard_id, shard in ordered:
+            take = min(shard["quantity"], remaining)
+            if take > 0:
+                shard["quantity"] -= take
+                taken.append((shard_id, take))
+                remaining -= take
+            if not remaining:
+                break
+        return taken
+
+    async def release(self, shard_id: str, quantity: int):
+        product_id = shard_id.rsplit(":", 1)[0]
+        shards = self._shards.get(product_id)
+        if not shards:
+            return
+        shard = shards.get(shard_id) or next(iter(shards.values()))
+        shard["quantity"] += quantity
+
+    async def save_reservation(self, reservation: dict):
+        self._reservations[reservation["_id"]] = copy.deepcopy(reservation)
+
+    async def complete_reservation(self, order_id: str):
+        self._reservations.pop(order_id, None)
+
+    async def claim_expired(self, now: datetime) -> Optional[dict]:
+        for order_id, reservation in self._reservations.items():
+            if reservation["expires_at"] < now:
+                return self._reservations.pop(order_id)
+        return None
+
+
+class MemoryWebhookEventRepository:
+    def __init__(self):
+        self._docs: Dict[str, dict] = {}
+
+    async def insert(self, event: dict) -> bool:
+        if event["_id"] in self._docs:
+            return False
+        self._docs[event["_id"]] = copy.deepcopy(event)
+        return True
+
+    async def mark_processed(self, event_ids: List[str], at: datetime):
+        for event_id in event_ids:
+            if event_id in self._docs:
+                self._docs[event_id]["processed_at"] = at
+
+    async def list_events(
+        self,
+        provider: Optional[str] = None,
+        since: Optional[datetime] = None,
+        only_unprocessed: bool = True,
+        limit: int = 1000
+    ) -> List[dict]:
+        since = _utc(since)
+        events = [
+            e for e in self._docs.values()
+            if (not only_unprocessed or e.get("processed_at") is None)
+            and (not provider or e["provider"] == provider)
+            and (not since or e["received_at"] >= since)
+        ]
+        events.sort(key=lambda e: e["received_at"])
+        return copy.deepcopy(events[:limit])
+
+
+# Seleção do backend e dependências FastAPI
+
+class Storage:
+    def __init__(self, users, carts, orders, webhook_events, inventory):
+        self.users = users
+        self.carts = carts
+        self.orders = orders
+        self.webhook_events = webhook_events
+        self.inventory = inventory
+
+
+_storage: Optional[Storage] = None
+
+
+def create_storage(backend: str = STORAGE_BACKEND) -> Storage:
+    if backend == "memory":
+        return Storage(
+            MemoryUserRepository(),
+            MemoryCartRepository(),
+            MemoryOrderRepository(),
+            MemoryWebhookEventRepository(),
+            MemoryInventoryRepository(),
+        )
+    from database import db
+    return create_motor_storage(db)
+
+
+def create_motor_storage(database) -> Storage:
+    return Storage(
+        MotorUserRepository(database.users),
+        MotorCartRepository(database.carts),
+        MotorOrderRepository(database.orders),
+        MotorWebhookEventRepository(database.webhook_events),
+        MotorInventoryRepository(database.inventory, database.reservations),
+    )
+
+
+def get_storage() -> Storage:
+    global _storage
+    if _storage is None:
+        _storage = create_storage()
+    return _storage
+
+
+def get_user_repository():
+    return get_storage().users
+
+
+def get_cart_repository():
+    return get_storage().carts
+
+
+def get_order_repository():
+    return get_storage().orders
+
+
+def get_webhook_event_repository():
+    return get_storage().webhook_events
+
+
+def get_inventory_repository():
+    return get_storage().inventory
+
+
+async def init_storage():
+    if STORAGE_BACKEND == "mongo":
+        from database import init_database
+        await init_database()
+
+
+def close_storage():
+    if STORAGE_BACKEND == "mongo":
+        from database import client
+        client.close()
@@ -0,0 +1,114 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from datetime import datetime
+from typing import Optional
+import base64
+import json
+from models import StatusResponse, StockUpdate
+from auth import get_current_user
+from repositories import get_user_repository, get_order_repository, get_inventory_repository
+from utils import only_digits, normalize_search
+
+async def require_admin(
+    current_user_id: str = Depends(get_current_user),
+    users=Depends(get_user_repository)
+) -> str:
+    user = await users.find_by_id(current_user_id)
+    if not user or user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso restrito à equipe de suporte"
+        )
+    return current_user_id
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+def encode_cursor(order: dict) -> str:
+    raw = json.dumps([order["created_at"].isoformat(), order["id"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, order_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), order_id
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
+
+@router.get("/orders", response_model=StatusResponse)
+async def search_orders(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    payment_type: Optional[str] = None,
+    cpf: Optional[str] = None,
+    email: Optional[str] = None,
+    payment_id: Optional[str] = None,
+    q: Optional[str] = Query(None, min_length=2, description="Prefixo do nome ou email"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    orders=Depends(get_order_repository)
+):
+    """Busca pedidos por status, data, documento, email ou forma de pagamento"""
+    
+    filters = {
+        "status": status_filter,
+        "payment_type": payment_type,
+        "cpf": only_digits(cpf) if cpf else None,
+        "email": email.strip().lower() if email else None,
+        "payment_id": payment_id,
+        "prefix": normalize_search(q) if q else None,
+        "created_from": created_from,
+        "created_to": created_to,
+    }
+    after = decode_cursor(cursor) if cursor else None
+    
+    results = await orders.search(filters, limit=limit, after=after, ascending=order == "asc")
+    
+    return StatusResponse(
+        success=True,
+        message="Pedidos encontrados",
+        data={
+            "orders": results,
+            "next_cursor": encode_cursor(results[-1]) if len(results) == limit else None
+        }
+    )
+
+
+@router.put("/inventory/{product_id}", response_model=StatusResponse)
+async def set_product_stock(
+    product_id: str,
+    stock: StockUpdate,
+    inventory=Depends(get_inventory_repository)
+):
+    """Define o estoque de um produto (substitui o saldo atual)"""
+    
+    await inventory.set_stock(product_id, stock.quantity, stock.shards)
+    
+    return StatusResponse(
+        success=True,
+        message="Estoque atualizado",
+        data={"product_id": product_id, "quantity": stock.quantity, "shards": stock.shards}
+    )
+
+@router.get("/inventory/{product_id}", response_model=StatusResponse)
+async def get_product_stock(
+    product_id: str,
+    inventory=Depends(get_inventory_repository)
+):
+    """Consulta o saldo de estoque de um produto"""
+    
+    quantity = await inventory.get_stock(product_id)
+    if quantity is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Produto sem controle de estoque"
+        )
+    
+    return StatusResponse(
+        success=True,
+        message="Estoque encontrado",
+        data={"product_id": product_id, "quantity": quantity}
+    )
@@ -1,18 +1,21 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from models import UserCreate, UserLogin, User, UserResponse, LoginResponse, StatusResponse
-from auth import get_password_hash, verify_password, create_access_token, get_current_user
-from database import users_collection
-from utils import validate_cpf, validate_cnpj_with_name
-import re
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Response
+from models import UserCreate, UserLogin, User, UserResponse, LoginResponse, StatusResponse, from_document
+from auth import (
+    get_password_hash, verify_password, create_access_token, get_current_user,
+    verify_guest_token, GUEST_CART_COOKIE
+)
+from repositories import get_user_repository, get_cart_repository
+from cart_service import merge_guest_cart
+from utils import validate_cpf, validate_cnpj_with_name, only_digits
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 @router.post("/register", response_model=StatusResponse)
-async def register_user(user_data: UserCreate):
+async def register_user(user_data: UserCreate, users=Depends(get_user_repository)):
     """Registra novo usuário com validação CPF/CNPJ"""
     
     # Verifica se email já existe
-    existing_user = await users_collection.find_one({"email": user_data.email})
+    existing_user = await users.find_by_email(user_data.email)
     if existing_user:
         return StatusResponse(
             success=False, 
@@ -20,10 +23,10 @@ async def register_user(user_data: UserCreate):
         )
     
     # Remove caracteres especiais do CPF/CNPJ
-    documento = re.sub(r'[^0-9]', '', user_data.cpf)
+    documento = only_digits(user_data.cpf)
     
     # Verifica se documento já existe
-    existing_doc = await users_collection.find_one({"cpf": user_data.cpf})
+    existing_doc = await users.find_by_cpf(user_data.cpf)
     if existing_doc:
         return StatusResponse(
             success=False, 
@@ -57,7 +60,7 @@ async def register_user(user_data: UserCreate):
     )
     
     try:
-        result = await users_collection.insert_one(user.dict())
+        await users.insert(user.dict())
         return StatusResponse(
             success=True, 
             message="Usuário cadastrado com sucesso",
@@ -70,10 +73,16 @@ async def register_user(user_data: UserCreate):
         )
 
 @router.post("/login", response_model=LoginResponse)
-async def login_user(login_data: UserLogin):
-    """Autentica usuário"""
+async def login_user(
+    login_data: UserLogin,
+    request: Request,
+    response: Response,
+    users=Depends(get_user_repository),
+    carts=Depends(get_cart_repository)
+):
+    """Autentica usuário e mescla o carrinho de visitante, se houver"""
     
-    user = await users_collection.find_one({"email": login_data.email})
+    user = await users.find_by_email(login_data.email)
     if not user or not verify_password(login_data.senha, user["senha_hash"]):
         return LoginResponse(
             success=False,
@@ -83,8 +92,14 @@ async def login_user(login_data: UserLogin):
     # Cria token JWT
     access_token = create_access_token(data={"sub": user["id"]})
     
+    # Mescla carrinho de visitante no carrinho do usuário
+    guest_id = verify_guest_token(request.cookies.get(GUEST_CART_COOKIE))
+    if guest_id:
+        await merge_guest_cart(carts, guest_id, user["id"])
+        response.delete_cookie(GUEST_CART_COOKIE)
+    
     # Remove senha_hash da resposta
-    user_response = UserResponse(**{k: v for k, v in user.items() if k != "senha_hash"})
+    user_response = from_document(UserResponse, {k: v for k, v in user.items() if k != "senha_hash"})
     
     return LoginResponse(
         success=True,
@@ -94,22 +109,25 @@ async def login_user(login_data: UserLogin):
     )
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user_id: str = Depends(get_current_user)):
+async def get_current_user_info(
+    current_user_id: str = Depends(get_current_user),
+    users=Depends(get_user_repository)
+):
     """Retorna informações do usuário logado"""
     
-    user = await users_collection.find_one({"id": current_user_id})
+    user = await users.find_by_id(current_user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Usuário não encontrado"
         )
     
-    return UserResponse(**{k: v for k, v in user.items() if k != "senha_hash"})
+    return from_document(UserResponse, {k: v for k, v in user.items() if k != "senha_hash"})
 
 @router.get("/validate-cpf/{cpf}")
 async def validate_cpf_endpoint(cpf: str):
     """Valida CPF"""
-    cpf_clean = re.sub(r'[^0-9]', '', cpf)
+    cpf_clean = only_digits(cpf)
     is_valid = validate_cpf(cpf_clean)
     
     return {
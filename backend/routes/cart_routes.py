@@ -1,27 +1,68 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 from typing import List, Optional
-from models import CartItem, Cart, StatusResponse
-from auth import get_current_user
-from database import carts_collection
+from models import CartItem, Cart, StatusResponse, cart_items_adapter
+from auth import (
+    get_current_user_optional, create_guest_token, verify_guest_token, GUEST_CART_COOKIE
+)
+from repositories import get_cart_repository
+from cart_service import guest_owner, GUEST_CART_TTL_DAYS
 
 router = APIRouter(prefix="/cart", tags=["Cart"])
 
-@router.post("/save", response_model=StatusResponse)
+# /save lê o corpo direto dos bytes; o schema é declarado à parte para o OpenAPI
+CART_ITEMS_SCHEMA = cart_items_adapter.json_schema(ref_template="#/components/schemas/{model}")
+CART_ITEMS_SCHEMA.pop("$defs", None)
+
+async def get_cart_owner(
+    request: Request,
+    response: Response,
+    current_user_id: Optional[str] = Depends(get_current_user_optional)
+) -> str:
+    """Identifica o dono do carrinho: usuário logado ou visitante via cookie assinado"""
+    if current_user_id:
+        return current_user_id
+
+    guest_id = verify_guest_token(request.cookies.get(GUEST_CART_COOKIE))
+    if not guest_id:
+        guest_id, token = create_guest_token()
+        response.set_cookie(
+            GUEST_CART_COOKIE,
+            token,
+            max_age=GUEST_CART_TTL_DAYS * 24 * 3600,
+            httponly=True,
+            samesite="lax"
+        )
+    return guest_owner(guest_id)
+
+@router.post(
+    "/save",
+    response_model=StatusResponse,
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": CART_ITEMS_SCHEMA}}
+    }}
+)
 async def save_cart(
-    cart_items: List[CartItem], 
-    current_user_id: str = Depends(get_current_user)
+    request: Request,
+    cart_owner: str = Depends(get_cart_owner),
+    carts=Depends(get_cart_repository)
 ):
-    """Salva carrinho do usuário"""
+    """Salva carrinho do usuário ou visitante"""
     
-    cart = Cart(user_id=current_user_id, items=cart_items)
+    # Valida a lista de itens direto do JSON, sem revalidar no modelo Cart
+    try:
+        cart_items: List[CartItem] = cart_items_adapter.validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+    
+    # Itens já validados passam pelo Cart sem revalidação (instâncias são aceitas como estão)
+    cart = Cart(user_id=cart_owner, items=cart_items)
     
     try:
         # Atualiza ou insere carrinho
-        await carts_collection.replace_one(
-            {"user_id": current_user_id},
-            cart.dict(),
-            upsert=True
-        )
+        await carts.replace(cart_owner, cart.model_dump())
         
         return StatusResponse(
             success=True,
@@ -34,10 +75,13 @@ async def save_cart(
         )
 
 @router.get("/get", response_model=StatusResponse)
-async def get_cart(current_user_id: str = Depends(get_current_user)):
+async def get_cart(
+    cart_owner: str = Depends(get_cart_owner),
+    carts=Depends(get_cart_repository)
+):
     """Recupera carrinho do usuário"""
     
-    cart = await carts_collection.find_one({"user_id": current_user_id})
+    cart = await carts.get(cart_owner)
     
     if not cart:
         return StatusResponse(
@@ -53,11 +97,14 @@ async def get_cart(current_user_id: str = Depends(get_current_user)):
     )
 
 @router.delete("/clear", response_model=StatusResponse)
-async def clear_cart(current_user_id: str = Depends(get_current_user)):
+async def clear_cart(
+    cart_owner: str = Depends(get_cart_owner),
+    carts=Depends(get_cart_repository)
+):
     """Limpa carrinho do usuário"""
     
     try:
-        await carts_collection.delete_one({"user_id": current_user_id})
+        await carts.delete(cart_owner)
         
         return StatusResponse(
             success=True,
@@ -72,30 +119,14 @@ async def clear_cart(current_user_id: str = Depends(get_current_user)):
 @router.post("/add-item", response_model=StatusResponse)
 async def add_item_to_cart(
     item: CartItem,
-    current_user_id: str = Depends(get_current_user)
+    cart_owner: str = Depends(get_cart_owner),
+    carts=Depends(get_cart_repository)
 ):
     """Adiciona item ao carrinho"""
     
-    cart = await carts_collection.find_one({"user_id": current_user_id})
-    
-    if not cart:
-        cart = Cart(user_id=current_user_id, items=[item])
-    else:
-        cart = Cart(**cart)
-        # Verifica se item já existe
-        existing_item = next((i for i in cart.items if i.id == item.id), None)
-        
-        if existing_item:
-            existing_item.quantity += item.quantity
-        else:
-            cart.items.append(item)
-    
     try:
-        await carts_collection.replace_one(
-            {"user_id": current_user_id},
-            cart.dict(),
-            upsert=True
-        )
+        # Soma quantidade atomicamente ($inc) ou adiciona nova linha
+        await carts.add_item(cart_owner, item.model_dump())
         
         return StatusResponse(
             success=True,
@@ -111,48 +142,26 @@ async def add_item_to_cart(
 async def update_cart_item(
     item_id: str,
     quantity: int,
-    current_user_id: str = Depends(get_current_user)
+    cart_owner: str = Depends(get_cart_owner),
+    carts=Depends(get_cart_repository)
 ):
     """Atualiza quantidade de um item no carrinho"""
     
-    cart = await carts_collection.find_one({"user_id": current_user_id})
-    
-    if not cart:
+    try:
+        item_found = await carts.update_item(cart_owner, item_id, quantity)
+    except Exception as e:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Carrinho não encontrado"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao atualizar item"
         )
     
-    cart = Cart(**cart)
-    item_found = False
-    
-    for item in cart.items:
-        if item.id == item_id:
-            if quantity <= 0:
-                cart.items.remove(item)
-            else:
-                item.quantity = quantity
-            item_found = True
-            break
-    
     if not item_found:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Item não encontrado no carrinho"
         )
     
-    try:
-        await carts_collection.replace_one(
-            {"user_id": current_user_id},
-            cart.dict()
-        )
-        
-        return StatusResponse(
-            success=True,
-            message="Item atualizado com sucesso"
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Erro ao atualizar item"
-        )
\ No newline at end of file
+    return StatusResponse(
+        success=True,
+        message="Item atualizado com sucesso"
+    )
\ No newline at end of file
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from typing import Optional
+from diagnostics import is_authorized, loop_monitor
+
+async def require_debug_token(x_debug_token: Optional[str] = Header(None)):
+    if not is_authorized(x_debug_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso não autorizado"
+        )
+
+router = APIRouter(prefix="/debug", tags=["Debug"], dependencies=[Depends(require_debug_token)])
+
+@router.get("/loop")
+async def get_loop_stats():
+    """Estatísticas de atraso do event loop"""
+    return loop_monitor.stats()
@@ -2,40 +2,65 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List
 from models import OrderCreate, Order, StatusResponse, PaymentResponse
 from auth import get_current_user
-from database import orders_collection, carts_collection
-from utils import calculate_shipping
+from repositories import get_order_repository, get_cart_repository, get_inventory_repository
+from inventory import reserve_items, release_items, hold_reservation, cancel_unpaid
+from utils import calculate_shipping, order_search_terms
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
 @router.post("/create", response_model=PaymentResponse)
 async def create_order(
     order_data: OrderCreate,
-    current_user_id: str = Depends(get_current_user)
+    current_user_id: str = Depends(get_current_user),
+    orders=Depends(get_order_repository),
+    carts=Depends(get_cart_repository),
+    inventory=Depends(get_inventory_repository)
 ):
-    """Cria pedido e processa pagamento"""
+    """Cria pedido, reserva estoque e processa pagamento"""
     
-    # Cria pedido
+    # Cria pedido reaproveitando os submodelos já validados no corpo: instâncias
+    # passam pela validação sem serem refeitas, mais rápido que model_construct
     order = Order(
         user_id=current_user_id,
-        **order_data.dict()
+        **dict(order_data)
     )
     
     try:
-        # Salva pedido
-        result = await orders_collection.insert_one(order.dict())
+        # Salva pedido com termos normalizados para a busca administrativa
+        document = order.model_dump()
+        document["search_terms"] = order_search_terms(order.cliente.nome, order.cliente.email)
+        
+        # Reserva estoque de todas as linhas (decremento condicional por produto)
+        reserved, unavailable = await reserve_items(inventory, document["carrinho"])
+        if reserved is None:
+            nome = next((i.name for i in order.carrinho if i.id == unavailable), unavailable)
+            return PaymentResponse(
+                success=False,
+                message=f"Estoque insuficiente para {nome}"
+            )
+        
+        try:
+            await orders.insert(document)
+            await hold_reservation(inventory, order.id, reserved)
+        except Exception:
+            await release_items(inventory, reserved)
+            raise
         
         # Limpa carrinho após pedido criado
-        await carts_collection.delete_one({"user_id": current_user_id})
+        await carts.delete(current_user_id)
         
         # Simula processamento de pagamento baseado no tipo
         payment_result = await process_payment(order)
         
         if payment_result["success"]:
             # Atualiza status do pedido
-            await orders_collection.update_one(
-                {"id": order.id},
-                {"$set": {"status": "pago", "payment_id": payment_result.get("payment_id")}}
-            )
+            await orders.set_status(order.id, "pago", payment_result.get("payment_id"))
+            await inventory.complete_reservation(order.id)
+        else:
+            # Pagamento não iniciado: cancela o pedido e devolve o estoque já,
+            # sem esperar a reserva expirar
+            await inventory.complete_reservation(order.id)
+            await cancel_unpaid(inventory, orders, order.id, reserved)
         
         return PaymentResponse(
             success=payment_result["success"],
@@ -52,13 +77,14 @@ async def create_order(
         )
 
 @router.get("/my-orders", response_model=StatusResponse)
-async def get_user_orders(current_user_id: str = Depends(get_current_user)):
+async def get_user_orders(
+    current_user_id: str = Depends(get_current_user),
+    orders_repo=Depends(get_order_repository)
+):
     """Retorna pedidos do usuário"""
     
     try:
-        orders = await orders_collection.find(
-            {"user_id": current_user_id}
-        ).sort("created_at", -1).to_list(100)
+        orders = await orders_repo.list_for_user(current_user_id, limit=100)
         
         return StatusResponse(
             success=True,
@@ -74,14 +100,12 @@ async def get_user_orders(current_user_id: str = Depends(get_current_user)):
 @router.get("/{order_id}", response_model=StatusResponse)
 async def get_order_details(
     order_id: str,
-    current_user_id: str = Depends(get_current_user)
+    current_user_id: str = Depends(get_current_user),
+    orders=Depends(get_order_repository)
 ):
     """Retorna detalhes de um pedido específico"""
     
-    order = await orders_collection.find_one({
-        "id": order_id,
-        "user_id": current_user_id
-    })
+    order = await orders.get_for_user(order_id, current_user_id)
     
     if not order:
         raise HTTPException(
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+import json
+from models import StatusResponse
+from repositories import get_webhook_event_repository
+from webhooks import WebhookError, build_event, webhook_processor
+
+router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
+
+@router.post("/{provider}", response_model=StatusResponse)
+async def receive_webhook(
+    provider: str,
+    request: Request,
+    events=Depends(get_webhook_event_repository)
+):
+    """Recebe notificação de pagamento: valida, deduplica e confirma imediatamente"""
+    
+    body = await request.body()
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="JSON inválido"
+        )
+    
+    try:
+        event = build_event(provider, dict(request.headers), body, payload)
+    except WebhookError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    
+    webhook_processor.stats["received"] += 1
+    
+    # Notificações repetidas pelo provedor são confirmadas sem reprocessar
+    if not await events.insert(event):
+        webhook_processor.stats["duplicates"] += 1
+        return StatusResponse(
+            success=True,
+            message="Notificação já recebida"
+        )
+    
+    # A transição de status é aplicada em lote pelo processador
+    await webhook_processor.submit(event)
+    
+    return StatusResponse(
+        success=True,
+        message="Notificação recebida"
+    )
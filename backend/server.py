@@ -1,4 +1,6 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Depends
+from fastapi.responses import JSONResponse
+import asyncio
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 import os
@@ -10,9 +12,21 @@ from routes.auth_routes import router as auth_router
 from routes.cart_routes import router as cart_router
 from routes.order_routes import router as order_router
 from routes.utils_routes import router as utils_router
+from routes.debug_routes import router as debug_router, require_debug_token
+from routes.webhook_routes import router as webhook_router
+from routes.admin_routes import router as admin_router
 
-# Import database initialization
-from database import init_database, client
+# Import storage initialization
+from repositories import (
+    init_storage, close_storage, get_cart_repository, get_order_repository, get_webhook_event_repository,
+    get_inventory_repository
+)
+from rate_limit import RateLimitMiddleware, metrics as rate_limit_metrics
+from cart_service import run_cart_compaction, get_cart_stats
+from diagnostics import DEBUG_TOOLS_ENABLED, ProfilingMiddleware, loop_monitor
+from load_shedding import LoadSheddingMiddleware, load_state
+from webhooks import webhook_processor
+from inventory import run_reservation_sweeper
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -40,15 +54,47 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "mx3network-api"}
 
+@api_router.get("/ready")
+async def readiness_check():
+    """Readiness para o balanceador: 503 quando o worker está sobrecarregado"""
+    state = load_state.readiness()
+    return JSONResponse(status_code=200 if state["ready"] else 503, content=state)
+
+# Métricas internas exigem o token de diagnóstico (X-Debug-Token)
+@api_router.get("/metrics/rate-limit", dependencies=[Depends(require_debug_token)])
+async def rate_limit_stats():
+    return rate_limit_metrics.snapshot()
+
+@api_router.get("/metrics/cart", dependencies=[Depends(require_debug_token)])
+async def cart_stats(carts=Depends(get_cart_repository)):
+    return await get_cart_stats(carts)
+
+@api_router.get("/metrics/webhooks", dependencies=[Depends(require_debug_token)])
+async def webhook_stats():
+    return webhook_processor.stats
+
 # Include all routers
 api_router.include_router(auth_router)
 api_router.include_router(cart_router)
 api_router.include_router(order_router)
 api_router.include_router(utils_router)
+api_router.include_router(webhook_router)
+api_router.include_router(admin_router)
+if DEBUG_TOOLS_ENABLED:
+    api_router.include_router(debug_router)
 
 # Include the main router in the app
 app.include_router(api_router)
 
+# Rate limiting nas rotas de autenticação e consulta
+app.add_middleware(RateLimitMiddleware)
+
+# Profiling sob demanda (somente com DEBUG_TOOLS_ENABLED)
+app.add_middleware(ProfilingMiddleware)
+
+# Descarte de carga por prioridade (checkout é o último a ser rejeitado)
+app.add_middleware(LoadSheddingMiddleware)
+
 # CORS Middleware
 app.add_middleware(
     CORSMiddleware,
@@ -65,14 +111,29 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def resolve_repository(dependency):
+    """Repositório para tarefas em segundo plano, respeitando app.dependency_overrides"""
+    return app.dependency_overrides.get(dependency, dependency)()
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize database on startup"""
-    await init_database()
+    await init_storage()
     logger.info("Database initialized successfully")
+    carts = resolve_repository(get_cart_repository)
+    orders = resolve_repository(get_order_repository)
+    inventory = resolve_repository(get_inventory_repository)
+    app.state.cart_compaction = asyncio.create_task(run_cart_compaction(carts))
+    app.state.reservation_sweeper = asyncio.create_task(run_reservation_sweeper(inventory, orders))
+    loop_monitor.start(watchdog=DEBUG_TOOLS_ENABLED)
+    webhook_processor.start(orders, resolve_repository(get_webhook_event_repository))
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
     """Close database connection on shutdown"""
-    client.close()
+    app.state.cart_compaction.cancel()
+    app.state.reservation_sweeper.cancel()
+    loop_monitor.stop()
+    webhook_processor.stop()
+    close_storage()
     logger.info("Database connection closed")
@@ -1,12 +1,28 @@
 import re
+import unicodedata
 import requests
 from typing import Dict, Any, Optional
 import os
 
+NON_DIGITS = re.compile(r'[^0-9]')
+
+def only_digits(value: str) -> str:
+    """Remove caracteres não numéricos (regex pré-compilada)"""
+    return NON_DIGITS.sub('', value)
+
+def normalize_search(value: str) -> str:
+    """Minúsculas e sem acentos, para busca por prefixo em índice"""
+    value = unicodedata.normalize('NFKD', value or '')
+    return ''.join(c for c in value if not unicodedata.combining(c)).lower().strip()
+
+def order_search_terms(nome: str, email: str) -> list:
+    """Termos da busca por prefixo gravados no pedido (nome e email do cliente)"""
+    return [normalize_search(nome), normalize_search(email)]
+
 # Função de validação de CPF
 def validate_cpf(cpf: str) -> bool:
     """Valida CPF usando algoritmo oficial"""
-    cpf = re.sub(r'[^0-9]', '', cpf)
+    cpf = only_digits(cpf)
     
     if len(cpf) != 11 or cpf == cpf[0] * 11:
         return False
@@ -28,7 +44,7 @@ def validate_cpf(cpf: str) -> bool:
 
 async def validate_cnpj_with_name(cnpj: str, nome: str) -> Dict[str, Any]:
     """Valida CNPJ e nome usando API ReceitaWS"""
-    cnpj_clean = re.sub(r'[^0-9]', '', cnpj)
+    cnpj_clean = only_digits(cnpj)
     
     if len(cnpj_clean) != 14:
         return {"valid": False, "message": "CNPJ deve ter 14 dígitos"}
@@ -68,7 +84,7 @@ async def validate_cnpj_with_name(cnpj: str, nome: str) -> Dict[str, Any]:
 
 async def get_address_by_cep(cep: str) -> Dict[str, Any]:
     """Consulta endereço pelo CEP usando ViaCEP"""
-    cep_clean = re.sub(r'[^0-9]', '', cep)
+    cep_clean = only_digits(cep)
     
     if len(cep_clean) != 8:
         return {"erro": True, "message": "CEP deve ter 8 dígitos"}
@@ -0,0 +1,50 @@
+"""Reaplica notificações de pagamento armazenadas.
+
+Uso:
+    python webhook_replay.py                      # pendentes de processamento
+    python webhook_replay.py --provider pagseguro --since 2025-01-31 --all
+
+As transições são guardadas pela máquina de estados do pedido, então reaplicar
+notificações já processadas é seguro.
+"""
+import argparse
+import asyncio
+from datetime import datetime
+
+from repositories import get_order_repository, get_webhook_event_repository
+from webhooks import WEBHOOK_BATCH_SIZE, apply_events
+
+async def replay(provider=None, since=None, include_processed=False, limit=10000) -> dict:
+    orders = get_order_repository()
+    events = get_webhook_event_repository()
+    stats = {"received": 0, "duplicates": 0, "applied": 0, "ignored": 0, "lookup_failures": 0, "batches": 0}
+
+    pending = await events.list_events(
+        provider=provider,
+        since=since,
+        only_unprocessed=not include_processed,
+        limit=limit
+    )
+    for start in range(0, len(pending), WEBHOOK_BATCH_SIZE):
+        await apply_events(orders, events, pending[start:start + WEBHOOK_BATCH_SIZE], stats)
+
+    stats["received"] = len(pending)
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Reaplica notificações de webhook armazenadas")
+    parser.add_argument("--provider", help="mercadopago, pagseguro ou infinitepay")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="data ISO mínima de recebimento")
+    parser.add_argument("--all", action="store_true", help="inclui notificações já processadas")
+    parser.add_argument("--limit", type=int, default=10000)
+    args = parser.parse_args()
+
+    stats = asyncio.run(replay(args.provider, args.since, args.all, args.limit))
+    print(
+        f"{stats['received']} notificações, {stats['applied']} aplicadas, "
+        f"{stats['ignored']} ignoradas, {stats['lookup_failures']} sem consulta ao provedor "
+        f"em {stats['batches']} lotes"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_BATCH_SIZE = int(os.environ.get("WEBHOOK_BATCH_SIZE", "500"))
+WEBHOOK_FLUSH_INTERVAL = float(os.environ.get("WEBHOOK_FLUSH_INTERVAL_MS", "50")) / 1000
+WEBHOOK_QUEUE_SIZE = int(os.environ.get("WEBHOOK_QUEUE_SIZE", "10000"))
+
+# Segredos de assinatura por provedor
+WEBHOOK_SECRETS = {
+    "mercadopago": os.environ.get("MERCADOPAGO_WEBHOOK_SECRET", ""),
+    "pagseguro": os.environ.get("PAGSEGURO_WEBHOOK_TOKEN", ""),
+    "infinitepay": os.environ.get("INFINITEPAY_WEBHOOK_SECRET", ""),
+}
+
+# Credencial para consultar pagamentos (o Mercado Pago só envia o id na notificação)
+MERCADOPAGO_ACCESS_TOKEN = os.environ.get("MERCADOPAGO_ACCESS_TOKEN", "")
+
+# Máquina de estados do pedido: status de destino -> status de origem permitidos
+ALLOWED_TRANSITIONS = {
+    "pago": ["pendente", "erro"],
+    "erro": ["pendente"],
+    "cancelado": ["pendente", "erro", "pago"],
+}
+
+
+class WebhookError(Exception):
+    """Notificação inválida (assinatura ou formato)"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+# Verificação de assinatura
+
+def _hmac_sha256(secret: str, message: bytes) -> str:
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def _verify_mercadopago(secret: str, headers: Dict[str, str], body: bytes, payload: dict) -> bool:
+    # x-signature: ts=<timestamp>,v1=<hmac do manifesto>
+    parts = dict(p.strip().split("=", 1) for p in headers.get("x-signature", "").split(",") if "=" in p)
+    data_id = str(payload.get("data", {}).get("id", ""))
+    manifest = f"id:{data_id};request-id:{headers.get('x-request-id', '')};ts:{parts.get('ts', '')};"
+    return hmac.compare_digest(parts.get("v1", ""), _hmac_sha256(secret, manifest.encode()))
+
+
+def _verify_pagseguro(secret: str, headers: Dict[str, str], body: bytes, payload: dict) -> bool:
+    # x-authenticity-token: sha256("<token>-<corpo>")
+    expected = hashlib.sha256(secret.encode() + b"-" + body).hexdigest()
+    return hmac.compare_digest(headers.get("x-authenticity-token", ""), expected)
+
+
+def _verify_hmac_body(secret: str, headers: Dict[str, str], body: bytes, payload: dict) -> bool:
+    # x-signature: sha256=<hmac do corpo>
+    signature = headers.get("x-signature", "")
+    if signature.startswith("sha256="):
+        signature = signature[7:]
+    return hmac.compare_digest(signature, _hmac_sha256(secret, body))
+
+
+# Normalização: cada provedor vira {event_id, order_id, payment_id, status}
+
+MERCADOPAGO_STATUS = {"approved": "pago", "rejected": "erro", "cancelled": "cancelado", "refunded": "cancelado"}
+PAGSEGURO_STATUS = {"PAID": "pago", "DECLINED": "erro", "CANCELED": "cancelado"}
+INFINITEPAY_STATUS = {"approved": "pago", "declined": "erro", "canceled": "cancelado", "refunded": "cancelado"}
+
+
+def _parse_mercadopago(payload: dict) -> dict:
+    # A notificação traz só {type, action, data.id}; pedido e status vêm da
+    # consulta ao pagamento, feita pelo processador (lookup_mercadopago)
+    payment_id = str(payload.get("data", {}).get("id", "")) if payload.get("type", "payment") == "payment" else ""
+    return {
+        "event_id": payload.get("id"),
+        "order_id": payload.get("external_reference"),
+        "payment_id": payment_id or None,
+        "status": MERCADOPAGO_STATUS.get(payload.get("status")),
+    }
+
+
+def _parse_pagseguro(payload: dict) -> dict:
+    charge = (payload.get("charges") or [{}])[0]
+    return {
+        "event_id": payload.get("notification_id") or charge.get("id"),
+        "order_id": payload.get("reference_id"),
+        "payment_id": charge.get("id"),
+        "status": PAGSEGURO_STATUS.get(charge.get("status")),
+    }
+
+
+def _parse_infinitepay(payload: dict) -> dict:
+    return {
+        "event_id": payload.get("event_id"),
+        "order_id": payload.get("order_nsu"),
+        "payment_id": payload.get("transaction_nsu"),
+        "status": INFINITEPAY_STATUS.get(payload.get("status")),
+    }
+
+
+# PayPal fica de fora: as notificações são assinadas com certificado (ou
+# validadas pela API verify-webhook-signature), não com HMAC de segredo
+# compartilhado, então _verify_hmac_body rejeitaria toda entrega real
+PROVIDERS = {
+    "mercadopago": (_verify_mercadopago, _parse_mercadopago),
+    "pagseguro": (_verify_pagseguro, _parse_pagseguro),
+    "infinitepay": (_verify_hmac_body, _parse_infinitepay),
+}
+
+
+# Consulta do pagamento para provedores cuja notificação não traz pedido e status
+
+def lookup_mercadopago(payment_id: str) -> dict:
+    response = requests.get(
+        f"https://api.mercadopago.com/v1/payments/{payment_id}",
+        headers={"Authorization": f"Bearer {MERCADOPAGO_ACCESS_TOKEN}"},
+        timeout=10
+    )
+    response.raise_for_status()
+    payment = response.json()
+    return {
+        "order_id": payment.get("external_reference"),
+        "status": MERCADOPAGO_STATUS.get(payment.get("status")),
+    }
+
+
+PAYMENT_LOOKUPS = {
+    "mercadopago": lookup_mercadopago,
+}
+
+
+def build_event(provider: str, headers: Dict[str, str], body: bytes, payload) -> dict:
+    """Verifica a assinatura e monta o documento da notificação"""
+    if provider not in PROVIDERS:
+        raise WebhookError("Provedor desconhecido", status_code=404)
+    if not isinstance(payload, dict):
+        raise WebhookError("Formato de notificação inválido")
+    secret = WEBHOOK_SECRETS.get(provider)
+    verify, parse = PROVIDERS[provider]
+    try:
+        verified = bool(secret) and verify(secret, headers, body, payload)
+        notification = parse(payload) if verified else None
+    except (AttributeError, TypeError, IndexError):
+        # Campos aninhados com tipo inesperado (ex.: "data": "123")
+        raise WebhookError("Formato de notificação inválido")
+    if not verified:
+        raise WebhookError("Assinatura inválida", status_code=401)
+
+    if not notification["event_id"]:
+        raise WebhookError("Notificação sem identificador")
+
+    return {
+        "_id": f"{provider}:{notification['event_id']}",
+        "provider": provider,
+        "order_id": notification["order_id"],
+        "payment_id": notification["payment_id"],
+        "status": notification["status"],
+        "payload": payload,
+        "received_at": datetime.utcnow(),
+        "processed_at": None,
+    }
+
+
+class WebhookProcessor:
+    """Aplica notificações em lote a partir de um buffer em memória.
+
+    As notificações já estão persistidas quando entram no buffer; se o processo
+    cair antes do lote ser aplicado, a ferramenta de replay as reprocessa.
+    """
+
+    def __init__(self, batch_size: int = WEBHOOK_BATCH_SIZE, flush_interval: float = WEBHOOK_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: Optional[asyncio.Queue] = None
+        self.orders = None
+        self.events = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"received": 0, "duplicates": 0, "applied": 0, "ignored": 0, "lookup_failures": 0, "batches": 0}
+
+    def start(self, orders, events):
+        self.orders = orders
+        self.events = events
+        self.queue = asyncio.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def submit(self, event: dict):
+        await self.queue.put(event)
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await apply_events(self.orders, self.events, batch, self.stats)
+            except Exception:
+                logger.exception("Erro ao aplicar lote de %d notificações", len(batch))
+
+
+async def resolve_events(batch: List[dict]) -> Set[str]:
+    """Completa pedido e status consultando o provedor; retorna os ids que falharam.
+
+    As consultas rodam em threads, fora do event loop e do caminho da requisição.
+    """
+    pending = [
+        e for e in batch
+        if e["provider"] in PAYMENT_LOOKUPS and e.get("payment_id") and not (e.get("order_id") and e.get("status"))
+    ]
+    if not pending:
+        return set()
+
+    results = await asyncio.gather(
+        *(asyncio.to_thread(PAYMENT_LOOKUPS[e["provider"]], e["payment_id"]) for e in pending),
+        return_exceptions=True
+    )
+    failed = set()
+    for event, result in zip(pending, results):
+        if isinstance(result, Exception):
+            logger.warning("Falha ao consultar pagamento %s (%s): %s", event["payment_id"], event["provider"], result)
+            failed.add(event["_id"])
+        else:
+            event.update(result)
+    return failed
+
+
+async def apply_events(orders, events, batch: List[dict], stats: Optional[dict] = None) -> int:
+    """Converte notificações em transições guardadas e as aplica em um único bulk_write.
+
+    Notificações cuja consulta ao provedor falhou continuam pendentes para o replay.
+    """
+    failed = await resolve_events(batch)
+    resolved = [e for e in batch if e["_id"] not in failed]
+    now = datetime.utcnow()
+    transitions = [
+        {
+            "order_id": e["order_id"],
+            "status": e["status"],
+            "payment_id": e["payment_id"],
+            "allowed_from": ALLOWED_TRANSITIONS[e["status"]],
+            "at": now,
+        }
+        for e in resolved
+        if e.get("order_id") and e.get("status") in ALLOWED_TRANSITIONS
+    ]
+    applied = await orders.apply_transitions(transitions)
+    await events.mark_processed([e["_id"] for e in resolved], now)
+
+    if stats is not None:
+        stats["batches"] += 1
+        stats["applied"] += applied
+        stats["ignored"] += len(resolved) - applied
+        stats["lookup_failures"] += len(failed)
+    return applied
+
+
+webhook_processor = WebhookProcessor()
@@ -15,51 +15,59 @@ export const useCart = () => {
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Envia o cookie do carrinho de visitante nas requisições
+axios.defaults.withCredentials = true;
+
 export const CartProvider = ({ children }) => {
   const [cart, setCart] = useState([]);
   const [loading, setLoading] = useState(false);
-  const { isAuthenticated, user } = useAuth();
+  const { isAuthenticated, user, token, loading: authLoading } = useAuth();
 
-  // Carrega carrinho do localStorage ou servidor
+  // Carrega carrinho do servidor (usuário ou visitante) com fallback para localStorage
   useEffect(() => {
+    // Espera a autenticação resolver: antes disso o GET sairia como visitante
+    // e receberia um carrinho vazio no lugar do carrinho do usuário
+    if (authLoading || (isAuthenticated && !user)) {
+      return;
+    }
+    // O header padrão do axios é definido pelo AuthProvider depois deste efeito
+    const headers = { Authorization: token ? `Bearer ${token}` : false };
+
     const loadCart = async () => {
-      if (isAuthenticated && user) {
-        // Usuário logado - tenta carregar do servidor
-        try {
-          const response = await axios.get(`${API}/cart/get`);
-          if (response.data.success) {
-            const serverCart = response.data.data.cart || [];
-            setCart(serverCart);
-            // Sincroniza com localStorage
-            localStorage.setItem('mx3-cart', JSON.stringify(serverCart));
+      const localCart = JSON.parse(localStorage.getItem('mx3-cart') || '[]');
+      try {
+        const response = await axios.get(`${API}/cart/get`, { headers });
+        if (response.data.success) {
+          const serverCart = response.data.data.cart || [];
+          if (!isAuthenticated && serverCart.length === 0 && localCart.length > 0) {
+            // Visitante com carrinho salvo antes do cookie: envia ao servidor em vez de descartar
+            setCart(localCart);
+            await axios.post(`${API}/cart/save`, localCart, { headers });
+            return;
           }
-        } catch (error) {
-          console.error('Erro ao carregar carrinho do servidor:', error);
-          // Fallback para localStorage
-          const localCart = JSON.parse(localStorage.getItem('mx3-cart') || '[]');
-          setCart(localCart);
+          setCart(serverCart);
+          // Sincroniza com localStorage
+          localStorage.setItem('mx3-cart', JSON.stringify(serverCart));
         }
-      } else {
-        // Usuário não logado - usa localStorage
-        const localCart = JSON.parse(localStorage.getItem('mx3-cart') || '[]');
+      } catch (error) {
+        console.error('Erro ao carregar carrinho do servidor:', error);
+        // Fallback para localStorage
         setCart(localCart);
       }
     };
 
     loadCart();
-  }, [isAuthenticated, user]);
+  }, [authLoading, isAuthenticated, user, token]);
 
   const saveCart = async (newCart) => {
     setCart(newCart);
     localStorage.setItem('mx3-cart', JSON.stringify(newCart));
     
-    // Se usuário estiver logado, salva no servidor também
-    if (isAuthenticated) {
-      try {
-        await axios.post(`${API}/cart/save`, newCart);
-      } catch (error) {
-        console.error('Erro ao salvar carrinho no servidor:', error);
-      }
+    // Salva no servidor também (carrinho de visitante usa cookie assinado)
+    try {
+      await axios.post(`${API}/cart/save`, newCart);
+    } catch (error) {
+      console.error('Erro ao salvar carrinho no servidor:', error);
     }
   };
 
@@ -99,12 +107,10 @@ export const CartProvider = ({ children }) => {
     setCart([]);
     localStorage.removeItem('mx3-cart');
     
-    if (isAuthenticated) {
-      try {
-        await axios.delete(`${API}/cart/clear`);
-      } catch (error) {
-        console.error('Erro ao limpar carrinho no servidor:', error);
-      }
+    try {
+      await axios.delete(`${API}/cart/clear`);
+    } catch (error) {
+      console.error('Erro ao limpar carrinho no servidor:', error);
     }
   };
 
@@ -0,0 +1,176 @@
+import asyncio
+import contextlib
+import copy
+import functools
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Configuração lida na importação dos módulos do backend
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("SHED_ENABLED", "false")
+os.environ.setdefault("DEBUG_TOKEN", "test-debug-token")
+
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL", "mongodb://localhost:27017")
+
+# Corpo válido de /api/orders/create, com cpf e email ainda por normalizar
+ORDER_PAYLOAD = {
+    "carrinho": [{"id": "camisa", "name": "Camisa", "price": 79.9, "quantity": 1, "image": "camisa.png"}],
+    "cliente": {"nome": "Maria Silva", "email": " Maria.Silva@Example.com", "telefone": "11987654321", "cpf": "529.982.247-25"},
+    "endereco": {"cep": "01001-000", "rua": "Praça da Sé", "numero": "1", "bairro": "Sé", "cidade": "São Paulo", "estado": "SP"},
+    "pagamento": {"tipo": "pix"},
+    "total": 79.9,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def mongo_available() -> bool:
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+    client = MongoClient(MONGO_TEST_URL, serverSelectionTimeoutMS=300)
+    try:
+        client.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+    finally:
+        client.close()
+
+
+@contextlib.asynccontextmanager
+async def _disposable_database():
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(MONGO_TEST_URL)
+    database = client[f"mx3_test_{uuid.uuid4().hex[:12]}"]
+    try:
+        yield database
+    finally:
+        await client.drop_database(database.name)
+        client.close()
+
+
+@pytest.fixture(params=["memory", "mongo"])
+def run_storage(request):
+    """Executa um cenário assíncrono sobre cada backend, com banco descartável no MongoDB"""
+    if request.param == "mongo" and not mongo_available():
+        pytest.skip(f"MongoDB indisponível em {MONGO_TEST_URL}")
+
+    def run(scenario):
+        from repositories import create_storage, create_motor_storage
+
+        async def main():
+            if request.param == "memory":
+                return await scenario(create_storage("memory"))
+            from database import create_indexes
+            async with _disposable_database() as database:
+                await create_indexes(database)
+                return await scenario(create_motor_storage(database))
+
+        return asyncio.run(main())
+
+    run.backend = request.param
+    return run
+
+
+@pytest.fixture
+def run_mongo():
+    """Executa um cenário assíncrono sobre um banco MongoDB descartável (pula sem MongoDB)"""
+    if not mongo_available():
+        pytest.skip(f"MongoDB indisponível em {MONGO_TEST_URL}")
+
+    def run(scenario):
+        async def main():
+            async with _disposable_database() as database:
+                return await scenario(database)
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def order_payload():
+    """Corpo de /api/orders/create; cada teste recebe sua própria cópia"""
+    return copy.deepcopy(ORDER_PAYLOAD)
+
+
+@pytest.fixture
+def order_document():
+    """Fábrica de documentos de pedido como gravados pela rota, o n-ésimo n minutos após o início"""
+    # Sem microssegundos: o BSON guarda milissegundos
+    start = datetime.utcnow().replace(microsecond=0)
+
+    def make(n: int, **overrides) -> dict:
+        order = {
+            "id": f"o{n:03d}",
+            "user_id": "u1",
+            "status": "pendente",
+            "payment_id": None,
+            "cliente": {"nome": "Maria", "email": f"maria{n % 2}@example.com", "cpf": "52998224725"},
+            "pagamento": {"tipo": "pix" if n % 2 else "cartao"},
+            "created_at": start + timedelta(minutes=n),
+            "search_terms": ["maria", f"maria{n % 2}@example.com"],
+        }
+        order.update(overrides)
+        return order
+
+    return make
+
+
+@pytest.fixture
+def storage():
+    from repositories import create_storage
+    return create_storage("memory")
+
+
+@pytest.fixture
+def client(storage):
+    """TestClient com repositórios em memória isolados por teste"""
+    from fastapi.testclient import TestClient
+    from repositories import (
+        get_user_repository, get_cart_repository, get_order_repository,
+        get_webhook_event_repository, get_inventory_repository
+    )
+    from server import app
+
+    app.dependency_overrides.update({
+        get_user_repository: lambda: storage.users,
+        get_cart_repository: lambda: storage.carts,
+        get_order_repository: lambda: storage.orders,
+        get_webhook_event_repository: lambda: storage.webhook_events,
+        get_inventory_repository: lambda: storage.inventory,
+    })
+    try:
+        with TestClient(app) as test_client:
+            yield test_client
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def debug_headers():
+    return {"X-Debug-Token": os.environ["DEBUG_TOKEN"]}
+
+
+@pytest.fixture
+def auth_headers(client):
+    """Cadastra e autentica um usuário; retorna o header Authorization"""
+    user = {"email": "cliente@example.com", "senha": "segredo123"}
+    response = client.post("/api/auth/register", json={
+        **user,
+        "nome_completo": "Cliente Teste",
+        "telefone": "11987654321",
+        "cpf": "52998224725",
+    })
+    assert response.json()["success"], response.text
+    response = client.post("/api/auth/login", json=user)
+    assert response.json()["success"], response.text
+    return {"Authorization": f"Bearer {response.json()['token']}"}
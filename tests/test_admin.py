@@ -0,0 +1,70 @@
+from backfill_orders import backfill
+
+def _grant_admin(client, storage):
+    assert client.portal.call(storage.users.set_role, "cliente@example.com", "admin")
+
+
+def test_admin_routes_require_admin_role(client, storage, auth_headers):
+    assert client.get("/api/admin/orders").status_code == 403
+    assert client.get("/api/admin/orders", headers=auth_headers).status_code == 403
+    _grant_admin(client, storage)
+    assert client.get("/api/admin/orders", headers=auth_headers).status_code == 200
+
+
+def test_order_customer_document_and_email_are_normalized(client, storage, auth_headers, order_payload):
+    response = client.post("/api/orders/create", json=order_payload, headers=auth_headers)
+    assert response.json()["success"], response.text
+    _grant_admin(client, storage)
+
+    orders = client.get("/api/orders/my-orders", headers=auth_headers).json()["data"]["orders"]
+    assert (orders[0]["cliente"]["cpf"], orders[0]["cliente"]["email"]) == ("52998224725", "maria.silva@example.com")
+
+    for params in (
+        {"cpf": "529.982.247-25"},
+        {"email": "MARIA.SILVA@example.com"},
+        {"q": "mar"},
+        {"status": "pago", "payment_type": "pix"},
+        {"created_from": "2000-01-01T00:00:00Z"},
+    ):
+        found = client.get("/api/admin/orders", params=params, headers=auth_headers).json()["data"]["orders"]
+        assert [o["id"] for o in found] == [orders[0]["id"]], params
+
+
+def test_admin_search_paginates_with_cursor(client, storage, auth_headers, order_payload):
+    for _ in range(5):
+        client.post("/api/orders/create", json=order_payload, headers=auth_headers)
+    _grant_admin(client, storage)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        data = client.get("/api/admin/orders", params=params, headers=auth_headers).json()["data"]
+        seen += [o["id"] for o in data["orders"]]
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 5
+    assert client.get("/api/admin/orders", params={"cursor": "invalido"}, headers=auth_headers).status_code == 400
+
+
+def test_backfill_makes_legacy_orders_searchable(run_storage, order_document):
+    async def scenario(storage):
+        orders = storage.orders
+        for n in range(5):
+            legacy = order_document(n, cliente={"nome": "José Souza", "email": f" Jose{n}@Example.com ", "cpf": "529.982.247-25"})
+            legacy.pop("search_terms")
+            await orders.insert(legacy)
+        await orders.insert(order_document(5))
+
+        assert [o["id"] for o in await orders.search({"cpf": "52998224725"})] == ["o005"]
+        assert await backfill(orders, batch_size=2, dry_run=True) == {"scanned": 6, "updated": 5, "batches": 3}
+        assert await orders.search({"prefix": "jose"}) == []
+
+        assert await backfill(orders, batch_size=2) == {"scanned": 6, "updated": 5, "batches": 3}
+        assert len(await orders.search({"cpf": "52998224725"})) == 6
+        assert [o["id"] for o in await orders.search({"email": "jose3@example.com"})] == ["o003"]
+        assert len(await orders.search({"prefix": "jose"})) == 5
+        # Idempotente: nada muda numa segunda execução
+        assert (await backfill(orders, batch_size=2))["updated"] == 0
+
+    run_storage(scenario)
@@ -0,0 +1,52 @@
+from auth import GUEST_CART_COOKIE
+
+ITEM = {"id": "camisa", "name": "Camisa", "price": 79.9, "quantity": 2, "image": "camisa.png"}
+
+
+def test_guest_cart_is_kept_in_signed_cookie(client):
+    response = client.post("/api/cart/add-item", json=ITEM)
+    assert response.status_code == 200
+    assert GUEST_CART_COOKIE in client.cookies
+
+    cart = client.get("/api/cart/get").json()["data"]["cart"]
+    assert [(i["id"], i["quantity"]) for i in cart] == [("camisa", 2)]
+
+    client.cookies.set(GUEST_CART_COOKIE, "forjado.assinatura")
+    assert client.get("/api/cart/get").json()["data"]["cart"] == []
+
+
+def test_non_ascii_guest_cookie_is_ignored(client):
+    client.cookies.clear()
+    response = client.get("/api/cart/get", headers={"cookie": f"{GUEST_CART_COOKIE}=abc.\xe9".encode("latin-1")})
+    assert response.status_code == 200
+    assert response.json()["data"]["cart"] == []
+
+
+def test_login_merges_guest_cart(client, auth_headers):
+    client.post("/api/cart/add-item", json=ITEM, headers=auth_headers)
+    client.cookies.clear()
+
+    client.post("/api/cart/add-item", json={**ITEM, "quantity": 3})
+    client.post("/api/cart/add-item", json={**ITEM, "id": "bone", "name": "Boné"})
+    response = client.post("/api/auth/login", json={"email": "cliente@example.com", "senha": "segredo123"})
+    assert response.json()["success"]
+
+    cart = client.get("/api/cart/get", headers=auth_headers).json()["data"]["cart"]
+    assert {i["id"]: i["quantity"] for i in cart} == {"camisa": 5, "bone": 2}
+
+
+def test_save_cart_rejects_invalid_body(client):
+    assert client.post("/api/cart/save", json=[{"id": "camisa"}]).status_code == 422
+    assert client.post("/api/cart/save", json=[ITEM]).status_code == 200
+
+
+def test_save_cart_documents_request_body(client):
+    body = client.get("/openapi.json").json()["paths"]["/api/cart/save"]["post"]["requestBody"]
+    schema = body["content"]["application/json"]["schema"]
+    assert schema == {"type": "array", "items": {"$ref": "#/components/schemas/CartItem"}}
+
+
+def test_metrics_require_debug_token(client, debug_headers):
+    for path in ("/api/metrics/cart", "/api/metrics/rate-limit", "/api/metrics/webhooks"):
+        assert client.get(path).status_code == 403
+        assert client.get(path, headers=debug_headers).status_code == 200
@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import diagnostics
+from diagnostics import LoopMonitor, ProfilingMiddleware, is_authorized
+
+
+def _busy(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def _busy_app(scope, receive, send):
+    _busy(0.05)
+    await send({"type": "http.response.start", "status": 201, "headers": []})
+    await send({"type": "http.response.body", "body": b"resposta"})
+
+
+async def _call(app, headers=(), query: bytes = b"") -> dict:
+    response = {"body": b""}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = dict(message["headers"])
+        else:
+            response["body"] += message["body"]
+
+    await app({"type": "http", "path": "/api/cart/get", "headers": list(headers), "query_string": query}, None, send)
+    return response
+
+
+def test_tokens_are_compared_safely(client):
+    assert is_authorized(diagnostics.DEBUG_TOKEN)
+    assert not is_authorized(None)
+    assert not is_authorized("errado")
+    assert not is_authorized("t\xe9st")
+
+    headers = {"x-debug-token": "t\xe9st".encode("latin-1")}
+    assert client.get("/api/metrics/cart", headers=headers).status_code == 403
+
+
+def test_profile_requires_token_and_returns_folded_stacks():
+    app = ProfilingMiddleware(_busy_app, enabled=True)
+    token = diagnostics.DEBUG_TOKEN.encode()
+
+    async def scenario():
+        assert (await _call(app))["body"] == b"resposta"
+        assert (await _call(app, [(b"x-profile-token", b"errado")]))["body"] == b"resposta"
+        assert (await _call(app, [(b"x-profile-token", "t\xe9st".encode("latin-1"))]))["body"] == b"resposta"
+        return [
+            await _call(app, [(b"x-profile-token", token)]),
+            await _call(app, query=b"__profile=" + token),
+        ]
+
+    for response in asyncio.run(scenario()):
+        assert response["status"] == 200
+        assert response["headers"][b"x-profiled-status"] == b"201"
+        lines = response["body"].decode().splitlines()
+        assert lines, "nenhuma amostra coletada"
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) > 0
+        # Formato collapsed: raiz primeiro, frame mais interno por último
+        assert stack.split(";")[-1].startswith("_busy (test_diagnostics.py:")
+
+
+def _blocking_callback():
+    _busy(0.3)
+
+
+def test_watchdog_captures_stall_and_survives_restart():
+    monitor = LoopMonitor(threshold=0.1, interval=0.01)
+
+    async def run_once():
+        monitor.start(watchdog=True)
+        await asyncio.sleep(0.05)
+        _blocking_callback()
+        await asyncio.sleep(0.05)
+        monitor.stop()
+
+    # Reiniciar depois de stop() precisa de um watchdog ativo de novo
+    for round_number in (1, 2):
+        asyncio.run(run_once())
+        assert len(monitor.stalls) == round_number
+        stall = monitor.stalls[-1]
+        assert stall["blocked_ms"] >= 100
+        assert "_blocking_callback (test_diagnostics.py:" in stall["stack"]
+    assert monitor.max_lag >= 0.2
+
+
+def test_debug_routes_are_not_mounted_by_default(client, debug_headers):
+    assert not diagnostics.DEBUG_TOOLS_ENABLED
+    assert client.get("/api/debug/loop", headers=debug_headers).status_code == 404
+    assert client.get("/api/metrics/cart", headers=debug_headers).status_code == 200
@@ -0,0 +1,131 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+from inventory import expire_reservations, reserve_items
+from webhooks import ALLOWED_TRANSITIONS
+
+
+def _with_quantity(order_payload: dict, quantity: int) -> dict:
+    return {**order_payload, "carrinho": [{**order_payload["carrinho"][0], "quantity": quantity}]}
+
+
+def test_concurrent_reservations_never_oversell(run_storage):
+    """Demanda muito acima do estoque, dividida entre shards: nada é vendido a mais"""
+    stock = {"camisa": 100, "bone": 30}
+
+    async def scenario(storage):
+        inventory = storage.inventory
+        await inventory.set_stock("camisa", stock["camisa"], shards=8)
+        await inventory.set_stock("bone", stock["bone"], shards=3)
+
+        rng = random.Random(34)
+        carts = [
+            [{"id": "camisa", "quantity": rng.randint(1, 12)}]
+            + ([{"id": "bone", "quantity": rng.randint(1, 5)}] if n % 3 == 0 else [])
+            for n in range(400)
+        ]
+        results = await asyncio.gather(*(reserve_items(inventory, cart) for cart in carts))
+
+        sold = {product_id: 0 for product_id in stock}
+        for reserved, _ in results:
+            for line in reserved or []:
+                sold[line["product_id"]] += line["quantity"]
+        for product_id, initial in stock.items():
+            remaining = await inventory.get_stock(product_id)
+            assert remaining >= 0
+            assert sold[product_id] + remaining == initial
+        assert any(len(reserved or []) > 2 for reserved, _ in results)
+
+    run_storage(scenario)
+
+
+def test_single_sku_contention_benchmark(run_storage):
+    """Milhares de reservas simultâneas de um SKU: no MongoDB disputam os mesmos shards"""
+    available, checkouts = 500, 2000
+
+    async def scenario(storage):
+        inventory = storage.inventory
+        await inventory.set_stock("camisa", available, shards=8)
+        started = time.perf_counter()
+        results = await asyncio.gather(*(
+            reserve_items(inventory, [{"id": "camisa", "quantity": 1 + n % 2}]) for n in range(checkouts)
+        ))
+        elapsed = time.perf_counter() - started
+
+        sold = sum(line["quantity"] for reserved, _ in results for line in reserved or [])
+        print(f"\n{checkouts} reservas ({run_storage.backend}): {checkouts / elapsed:.0f}/s, {sold} de {available} vendidos")
+        assert sold + await inventory.get_stock("camisa") == available
+        assert sold <= available
+
+    run_storage(scenario)
+
+
+def test_sweeper_keeps_stock_of_orders_that_can_still_be_paid(run_storage, order_document):
+    async def scenario(storage):
+        inventory, orders = storage.inventory, storage.orders
+        await inventory.set_stock("camisa", 3)
+        expired_at = datetime.utcnow() - timedelta(minutes=1)
+        for n, status in enumerate(("erro", "pago", "cancelado")):
+            reserved, _ = await reserve_items(inventory, [{"id": "camisa", "quantity": 1}])
+            await orders.insert(order_document(n, status=status))
+            await inventory.save_reservation({"_id": f"o{n:03d}", "lines": reserved, "expires_at": expired_at})
+
+        assert await expire_reservations(inventory, orders) == 3
+        # erro é cancelado e devolve; pago fica com a unidade; cancelado devolve
+        assert [(await orders.find_by_id(f"o{n:03d}"))["status"] for n in range(3)] == ["cancelado", "pago", "cancelado"]
+        assert await inventory.get_stock("camisa") == 2
+        # Pedido cancelado pela expiração não pode mais ser pago
+        assert await orders.apply_transitions([{
+            "order_id": "o000", "status": "pago", "payment_id": "p",
+            "allowed_from": ALLOWED_TRANSITIONS["pago"], "at": datetime.utcnow(),
+        }]) == 0
+
+    run_storage(scenario)
+
+
+def test_failed_payment_releases_stock(client, storage, auth_headers, order_payload):
+    client.portal.call(storage.inventory.set_stock, "camisa", 1)
+    order_payload["pagamento"] = {"tipo": "cheque"}
+    response = client.post("/api/orders/create", json=order_payload, headers=auth_headers).json()
+    assert not response["success"]
+
+    [order] = client.get("/api/orders/my-orders", headers=auth_headers).json()["data"]["orders"]
+    assert order["status"] == "cancelado"
+    assert client.portal.call(storage.inventory.get_stock, "camisa") == 1
+    assert client.portal.call(expire_reservations, storage.inventory, storage.orders) == 0
+
+
+def test_rejects_non_positive_quantities(client, storage, auth_headers, order_payload):
+    client.portal.call(storage.inventory.set_stock, "camisa", 5)
+    for quantity in (0, -5):
+        body = _with_quantity(order_payload, quantity)
+        assert client.post("/api/orders/create", json=body, headers=auth_headers).status_code == 422
+    assert client.portal.call(storage.inventory.get_stock, "camisa") == 5
+
+
+def test_checkout_oversell_benchmark(client, storage, auth_headers, order_payload):
+    """Checkouts HTTP concorrentes disputando o mesmo produto: vendas == estoque"""
+    available, checkouts = 500, 2000
+    body = _with_quantity(order_payload, 1)
+    client.portal.call(storage.inventory.set_stock, "camisa", available, 4)
+
+    async def send_all():
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            responses = await asyncio.gather(*(
+                http.post("/api/orders/create", json=body, headers=auth_headers)
+                for _ in range(checkouts)
+            ))
+        return [response.json()["success"] for response in responses]
+
+    started = time.perf_counter()
+    results = client.portal.call(send_all)
+    elapsed = time.perf_counter() - started
+    print(f"\n{checkouts} checkouts para {available} unidades: {checkouts / elapsed:.0f}/s, {sum(results)} vendidos")
+
+    assert sum(results) == available
+    assert client.portal.call(storage.inventory.get_stock, "camisa") == 0
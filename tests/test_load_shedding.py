@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+import pytest
+
+import load_shedding
+from diagnostics import LoopMonitor
+from load_shedding import LoadSheddingMiddleware, LoadState
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    loop_monitor = LoopMonitor(interval=0.01)
+    monkeypatch.setattr(load_shedding, "loop_monitor", loop_monitor)
+    monkeypatch.setattr(load_shedding, "load_state", LoadState())
+    yield loop_monitor
+    loop_monitor.stop()
+
+
+async def _app(scope, receive, send):
+    if scope["path"].startswith("/api/utils/"):
+        time.sleep(0.004)  # consulta com trecho síncrono, bloqueia o loop
+    else:
+        await asyncio.sleep(0.005)  # checkout espera o banco
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _request(app, path: str) -> int:
+    status = 0
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app({"type": "http", "path": path, "headers": []}, None, send)
+    return status
+
+
+def test_single_block_does_not_shed_queued_requests(monitor):
+    async def scenario():
+        monitor.start(watchdog=False)
+        await asyncio.sleep(0.1)
+        app = LoadSheddingMiddleware(_app, enabled=True)
+
+        # Agendadas antes do bloqueio, rodam logo após ele e antes do próximo heartbeat
+        queued = [asyncio.ensure_future(_request(app, "/api/cart/get")) for _ in range(20)]
+        time.sleep(0.33)  # ex.: hash bcrypt no loop
+        assert await asyncio.gather(*queued) == [200] * 20
+
+    asyncio.run(scenario())
+
+
+def test_checkout_goodput_under_overload(monitor, monkeypatch):
+    """Carga em malha aberta acima da capacidade: o checkout continua dentro do SLO"""
+    monkeypatch.setattr(load_shedding, "SHED_LOOP_LAG", 0.02)
+    lookups_per_second = 500  # 4 ms de CPU cada: o dobro do que o loop suporta
+    checkouts_per_second = 50
+    slo = 0.25
+
+    async def run_load(app, seconds: float) -> dict:
+        results = {"checkout": [], "lookup": []}
+
+        async def timed(kind: str, path: str, arrival: float):
+            status = await _request(app, path)
+            results[kind].append((status, time.perf_counter() - arrival))
+
+        started = time.perf_counter()
+        tasks = []
+        sent = {"checkout": 0, "lookup": 0}
+        while time.perf_counter() - started < seconds:
+            # Chegadas independem das respostas: agenda tudo o que já venceu
+            for kind, path, rate in (
+                ("lookup", "/api/utils/cep/01001000", lookups_per_second),
+                ("checkout", "/api/orders/create", checkouts_per_second),
+            ):
+                while sent[kind] < (time.perf_counter() - started) * rate:
+                    arrival = started + sent[kind] / rate
+                    tasks.append(asyncio.ensure_future(timed(kind, path, arrival)))
+                    sent[kind] += 1
+            await asyncio.sleep(0.005)
+        await asyncio.gather(*tasks)
+        return results
+
+    def summary(results: dict) -> dict:
+        checkout = results["checkout"]
+        return {
+            "checkout_goodput": sum(1 for status, elapsed in checkout if status == 200 and elapsed <= slo) / len(checkout),
+            "lookup_shed": sum(1 for status, _ in results["lookup"] if status == 503) / len(results["lookup"]),
+        }
+
+    async def scenario():
+        monitor.start(watchdog=False)
+        unprotected = summary(await run_load(LoadSheddingMiddleware(_app, enabled=False), 1.0))
+        await asyncio.sleep(0.2)
+        protected = summary(await run_load(LoadSheddingMiddleware(_app, enabled=True), 1.0))
+        print(f"\nsem descarte: {unprotected}\ncom descarte: {protected}")
+
+        assert protected["checkout_goodput"] >= 0.9
+        assert protected["checkout_goodput"] > unprotected["checkout_goodput"]
+        assert protected["lookup_shed"] > 0
+
+    asyncio.run(scenario())
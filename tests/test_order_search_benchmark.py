@@ -0,0 +1,73 @@
+import asyncio
+import statistics
+import time
+from datetime import timedelta
+
+SEEDED_ORDERS = 20_000
+
+QUERIES = {
+    "recentes": {},
+    "status": {"status": "pago"},
+    "status+pagamento": {"status": "pago", "payment_type": "pix"},
+    "cpf": {"cpf": f"{123:011d}"},
+    "email": {"email": "cliente123@example.com"},
+    "prefixo": {"prefix": "cliente12"},
+    "payment_id": {"payment_id": "pay-12345"},
+}
+
+
+async def _seed(orders, order_document):
+    for start in range(0, SEEDED_ORDERS, 500):
+        await asyncio.gather(*(
+            orders.insert(order_document(
+                n,
+                id=f"o{n:06d}",
+                status="pago" if n % 4 == 0 else "pendente",
+                payment_id=f"pay-{n}",
+                pagamento={"tipo": "pix" if n % 3 == 0 else "credit_card"},
+                cliente={"nome": "Cliente", "email": f"cliente{n % 1000}@example.com", "cpf": f"{n % 1000:011d}"},
+                search_terms=[f"cliente{n}", f"cliente{n % 1000}@example.com"],
+            ))
+            for n in range(start, min(start + 500, SEEDED_ORDERS))
+        ))
+
+
+async def _latencies_ms(search, runs: int = 15) -> list:
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await search()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def test_admin_search_latency_benchmark(run_storage, order_document):
+    """Latência da busca administrativa sobre uma base semeada (p50/p95 em ms)"""
+    async def scenario(storage):
+        orders = storage.orders
+        await _seed(orders, order_document)
+        report = {}
+        for name, filters in QUERIES.items():
+            results = await orders.search(filters, limit=50)
+            assert results, name
+            report[name] = await _latencies_ms(lambda: orders.search(filters, limit=50))
+
+        # Página profunda via keyset: o custo não cresce com o número da página
+        page = await orders.search({"status": "pago"}, limit=50)
+        for _ in range(20):
+            page = await orders.search({"status": "pago"}, limit=50, after=(page[-1]["created_at"], page[-1]["id"]))
+        after = (page[-1]["created_at"], page[-1]["id"])
+        report["status, página 21"] = await _latencies_ms(lambda: orders.search({"status": "pago"}, limit=50, after=after))
+
+        window = {"created_from": page[-1]["created_at"] - timedelta(days=1), "created_to": page[-1]["created_at"]}
+        report["intervalo"] = await _latencies_ms(lambda: orders.search(window, limit=50))
+
+        print(f"\n{SEEDED_ORDERS} pedidos ({run_storage.backend}):")
+        for name, latencies in report.items():
+            p95 = statistics.quantiles(latencies, n=20)[-1]
+            print(f"  {name:<20} p50 {statistics.median(latencies):7.2f} ms  p95 {p95:7.2f} ms")
+        if run_storage.backend == "mongo":
+            # Com índices, cada consulta lê só a página pedida
+            assert all(statistics.median(latencies) < 50 for latencies in report.values()), report
+
+    run_storage(scenario)
@@ -0,0 +1,83 @@
+"""Planos da busca administrativa: cada filtro deve usar um índice (somente MongoDB)"""
+from datetime import datetime, timedelta
+
+import pytest
+
+pytestmark = pytest.mark.parametrize("run_storage", ["mongo"], indirect=True)
+
+
+async def _seed(orders, order_document, count: int = 200):
+    # Valores variados para que o índice do filtro seja o plano mais seletivo
+    for n in range(count):
+        await orders.insert(order_document(
+            n,
+            status="pago" if n % 5 == 0 else "pendente",
+            cliente={"nome": "Maria", "email": f"maria{n % 7}@example.com", "cpf": f"{n % 11:011d}"},
+            search_terms=[f"cliente{n}", f"maria{n % 7}@example.com"],
+            payment_id=f"pay-{n}" if n % 5 == 0 else None,
+        ))
+
+
+def _stages(plan) -> list:
+    """Estágios do plano vencedor, de cima para baixo, com o índice usado"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append((plan["stage"], plan.get("indexName")))
+        for key in ("queryPlan", "inputStage"):
+            stages += _stages(plan.get(key))
+        for child in plan.get("inputStages", []):
+            stages += _stages(child)
+    return stages
+
+
+async def _winning_stages(orders, filters: dict, after=None, ascending: bool = False) -> list:
+    explain = await orders.explain_search(filters, after=after, ascending=ascending)
+    return _stages(explain["queryPlanner"]["winningPlan"])
+
+
+@pytest.mark.parametrize("filters, index", [
+    ({}, "created_at_-1_id_-1"),
+    ({"status": "pago"}, "status_1_created_at_-1_id_-1"),
+    ({"payment_type": "pix"}, "pagamento.tipo_1_created_at_-1_id_-1"),
+    ({"cpf": "00000000003"}, "cliente.cpf_1_created_at_-1_id_-1"),
+    ({"email": "maria3@example.com"}, "cliente.email_1_created_at_-1_id_-1"),
+    ({"status": "pago", "created_from": datetime.utcnow(), "created_to": datetime.utcnow() + timedelta(hours=2)},
+     "status_1_created_at_-1_id_-1"),
+])
+def test_equality_filters_use_index_without_sort(run_storage, order_document, filters, index):
+    async def scenario(storage):
+        await _seed(storage.orders, order_document)
+        for ascending in (False, True):
+            stages = await _winning_stages(storage.orders, filters, ascending=ascending)
+            assert ("IXSCAN", index) in stages, stages
+            assert not any(stage == "SORT" for stage, _ in stages), stages
+
+    run_storage(scenario)
+
+
+@pytest.mark.parametrize("filters, index", [
+    ({"prefix": "cliente12"}, "search_terms_1_created_at_-1_id_-1"),
+    ({"payment_id": "pay-10"}, "payment_id_1"),
+])
+def test_selective_filters_use_index(run_storage, order_document, filters, index):
+    """Prefixo e payment_id usam índice; a ordenação pode exigir SORT em memória"""
+    async def scenario(storage):
+        await _seed(storage.orders, order_document)
+        stages = await _winning_stages(storage.orders, filters)
+        assert ("IXSCAN", index) in stages, stages
+        assert not any(stage == "COLLSCAN" for stage, _ in stages), stages
+
+    run_storage(scenario)
+
+
+def test_keyset_page_uses_index(run_storage, order_document):
+    async def scenario(storage):
+        await _seed(storage.orders, order_document)
+        page = await storage.orders.search({"status": "pago"}, limit=10)
+        after = (page[-1]["created_at"], page[-1]["id"])
+        stages = await _winning_stages(storage.orders, {"status": "pago"}, after=after)
+        assert ("IXSCAN", "status_1_created_at_-1_id_-1") in stages, stages
+        assert not any(stage == "COLLSCAN" for stage, _ in stages), stages
+
+    run_storage(scenario)
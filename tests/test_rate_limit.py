@@ -0,0 +1,136 @@
+import asyncio
+import time
+
+import pytest
+
+import rate_limit
+from rate_limit import MemoryStore, MongoStore, RateLimitMiddleware, RateLimitRule
+
+RULE = RateLimitRule("login", "/api/auth/login", 10, 60)
+
+
+def _scope(path: str, ip: str = "10.0.0.1", forwarded_for: str = None) -> dict:
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for else []
+    return {"type": "http", "path": path, "headers": headers, "client": (ip, 1234)}
+
+
+async def _ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _call(app, scope) -> int:
+    status = 0
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, None, send)
+    return status
+
+
+def test_gcra_allows_limit_then_rejects():
+    async def scenario():
+        store = MemoryStore()
+        now = 1000.0
+        results = [await store.hit("ip:a:login", RULE, now) for _ in range(RULE.limit + 1)]
+        assert results[:RULE.limit] == [0.0] * RULE.limit
+        assert results[-1] > 0
+        # Um intervalo depois, uma nova requisição cabe no período
+        assert await store.hit("ip:a:login", RULE, now + RULE.interval) == 0.0
+
+    asyncio.run(scenario())
+
+
+async def _gcra_sequence(store) -> list:
+    """Retry-after de uma sequência fixa de requisições, para comparar os stores"""
+    now = 1000.0
+    results = [await store.hit("ip:a:login", RULE, now) for _ in range(RULE.limit + 2)]
+    results.append(await store.hit("ip:a:login", RULE, now + RULE.interval))
+    results.append(await store.hit("ip:a:login", RULE, now + RULE.interval))
+    results.append(await store.hit("ip:b:login", RULE, now + RULE.interval))
+    results.append(await store.hit("ip:a:login", RULE, now + RULE.period * 2))
+    return results
+
+
+def test_mongo_store_matches_memory_store(run_mongo):
+    expected = asyncio.run(_gcra_sequence(MemoryStore()))
+    assert run_mongo(lambda database: _gcra_sequence(MongoStore(database.rate_limits))) == pytest.approx(expected)
+
+
+def test_memory_store_evicts_least_recently_used_key():
+    async def scenario():
+        store = MemoryStore(max_keys=3)
+        now = 1000.0
+        for _ in range(RULE.limit):
+            await store.hit("abuser", RULE, now)
+        await store.hit("a", RULE, now)
+        await store.hit("b", RULE, now)
+        # O abusador volta a ser o mais recente ao ser rejeitado
+        assert await store.hit("abuser", RULE, now) > 0
+        for n in range(100):
+            await store.hit(f"new-{n}", RULE, now)
+            await store.hit("abuser", RULE, now)
+        assert len(store) == 3
+        assert await store.hit("abuser", RULE, now) > 0
+
+    asyncio.run(scenario())
+
+
+def test_middleware_returns_429_with_retry_after():
+    async def scenario():
+        app = RateLimitMiddleware(_ok_app, store=MemoryStore(), enabled=True)
+        statuses = [await _call(app, _scope("/api/auth/login")) for _ in range(RULE.limit + 1)]
+        assert statuses[:RULE.limit] == [200] * RULE.limit
+        assert statuses[-1] == 429
+        assert await _call(app, _scope("/api/auth/login", ip="10.0.0.2")) == 200
+        assert await _call(app, _scope("/api/orders/my-orders")) == 200
+
+    asyncio.run(scenario())
+
+
+def test_forwarded_for_uses_entry_added_by_trusted_proxy(monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_TRUST_PROXY", True)
+
+    async def scenario():
+        app = RateLimitMiddleware(_ok_app, store=MemoryStore(), enabled=True)
+        # A entrada mais à esquerda é do cliente: trocá-la a cada tentativa não muda o limite
+        statuses = [
+            await _call(app, _scope("/api/auth/login", ip="10.0.0.254", forwarded_for=f"1.2.3.{n}, 200.1.1.1"))
+            for n in range(RULE.limit + 1)
+        ]
+        assert statuses[-1] == 429
+        assert await _call(app, _scope("/api/auth/login", ip="10.0.0.254", forwarded_for="200.1.1.2")) == 200
+
+        monkeypatch.setattr(rate_limit, "RATE_LIMIT_TRUSTED_HOPS", 2)
+        assert rate_limit._client_ip({}, {b"x-forwarded-for": b"6.6.6.6, 200.1.1.3, 10.0.0.9"}) == "200.1.1.3"
+        assert rate_limit._client_ip({}, {b"x-forwarded-for": b"200.1.1.4"}) == "200.1.1.4"
+
+    asyncio.run(scenario())
+
+
+def test_middleware_overhead_benchmark():
+    """Custo por requisição do middleware, em microssegundos"""
+    requests = 20_000
+
+    async def measure(app, path: str) -> float:
+        started = time.perf_counter()
+        for n in range(requests):
+            await _call(app, _scope(path, ip=f"10.{n % 250}.{n // 250 % 250}.1"))
+        return (time.perf_counter() - started) / requests * 1e6
+
+    async def scenario():
+        baseline = await measure(_ok_app, "/api/auth/login")
+        app = RateLimitMiddleware(_ok_app, store=MemoryStore(max_keys=1_000), enabled=True)
+        limited = await measure(app, "/api/auth/login")
+        unlimited = await measure(app, "/api/orders/my-orders")
+        print(
+            f"\nrate limit overhead: limited route {limited - baseline:.2f} us/req, "
+            f"other routes {unlimited - baseline:.2f} us/req"
+        )
+        assert limited - baseline < 100
+        assert unlimited - baseline < 20
+
+    asyncio.run(scenario())
@@ -0,0 +1,276 @@
+"""Paridade entre os backends: cada cenário roda no MongoDB (se disponível) e em memória"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from repositories import UNTRACKED, DuplicateError
+
+# Sem microssegundos (o BSON guarda milissegundos) e recente (índice TTL dos carrinhos)
+NOW = datetime.utcnow().replace(microsecond=0)
+
+
+def _user(n: int, **overrides) -> dict:
+    user = {"id": f"u{n}", "email": f"u{n}@example.com", "cpf": f"{n:011d}", "nome_completo": f"Usuário {n}"}
+    user.update(overrides)
+    return user
+
+
+def _item(item_id: str, quantity: int = 1) -> dict:
+    return {"id": item_id, "name": item_id.title(), "price": 10.0, "quantity": quantity, "image": ""}
+
+
+def test_users(run_storage):
+    async def scenario(storage):
+        users = storage.users
+        await users.insert(_user(1))
+        assert (await users.find_by_email("u1@example.com"))["id"] == "u1"
+        assert (await users.find_by_cpf(_user(1)["cpf"]))["id"] == "u1"
+        assert (await users.find_by_id("u1"))["email"] == "u1@example.com"
+        assert "_id" not in await users.find_by_id("u1")
+        assert await users.find_by_id("u2") is None
+
+        with pytest.raises(DuplicateError):
+            await users.insert(_user(2, email="u1@example.com"))
+        with pytest.raises(DuplicateError):
+            await users.insert(_user(3, cpf=_user(1)["cpf"]))
+
+        assert await users.set_role("u1@example.com", "admin")
+        assert (await users.find_by_id("u1"))["role"] == "admin"
+        assert await users.set_role("u1@example.com", None)
+        assert "role" not in await users.find_by_id("u1")
+        assert not await users.set_role("u9@example.com", "admin")
+
+    run_storage(scenario)
+
+
+def test_cart_items(run_storage):
+    async def scenario(storage):
+        carts = storage.carts
+        await carts.add_item("u1", _item("camisa", 2))
+        await carts.add_item("u1", _item("camisa", 3))
+        await carts.add_item("u1", _item("bone"))
+        cart = await carts.get("u1")
+        assert "_id" not in cart
+        assert [(i["id"], i["quantity"]) for i in cart["items"]] == [("camisa", 5), ("bone", 1)]
+
+        assert await carts.update_item("u1", "bone", 4)
+        assert await carts.update_item("u1", "camisa", 0)
+        assert not await carts.update_item("u1", "meia", 1)
+        assert not await carts.update_item("u2", "bone", 1)
+        assert [(i["id"], i["quantity"]) for i in (await carts.get("u1"))["items"]] == [("bone", 4)]
+
+        await carts.replace("u1", {"user_id": "u1", "items": [_item("meia")], "updated_at": NOW})
+        assert [i["id"] for i in (await carts.get("u1"))["items"]] == ["meia"]
+        await carts.delete("u1")
+        assert await carts.get("u1") is None
+
+    run_storage(scenario)
+
+
+def test_cart_take_restore_and_merge(run_storage):
+    async def scenario(storage):
+        carts = storage.carts
+        await carts.replace("guest:g1", {"user_id": "guest:g1", "items": [_item("camisa", 2), _item("bone")], "updated_at": NOW})
+        await carts.replace("u1", {"user_id": "u1", "items": [_item("camisa", 1)], "updated_at": NOW})
+
+        guest = await carts.take("guest:g1")
+        assert await carts.get("guest:g1") is None
+        await carts.merge_items("u1", guest["items"])
+        assert {i["id"]: i["quantity"] for i in (await carts.get("u1"))["items"]} == {"camisa": 3, "bone": 1}
+
+        await carts.merge_items("u2", [_item("meia", 2)])
+        assert [(i["id"], i["quantity"]) for i in (await carts.get("u2"))["items"]] == [("meia", 2)]
+
+        await carts.restore(guest)
+        assert await carts.get("guest:g1") is not None
+        with pytest.raises(DuplicateError):
+            await carts.restore(guest)
+
+    run_storage(scenario)
+
+
+def test_cart_compaction_and_counts(run_storage):
+    async def scenario(storage):
+        carts = storage.carts
+        old = NOW - timedelta(days=10)
+        await carts.replace("u1", {"user_id": "u1", "items": [], "updated_at": old})
+        await carts.replace("u2", {"user_id": "u2", "items": [_item("camisa")], "updated_at": old})
+        await carts.replace("u3", {"user_id": "u3", "items": [], "updated_at": NOW})
+        await carts.replace("guest:a", {"user_id": "guest:a", "items": [_item("camisa")], "updated_at": old})
+        await carts.replace("guest:b", {"user_id": "guest:b", "items": [_item("camisa")], "updated_at": NOW})
+        assert await carts.count() == 5
+        assert await carts.count_guests() == 2
+
+        empty_before = NOW - timedelta(hours=1)
+        guest_before = NOW - timedelta(days=7)
+        assert await carts.delete_stale(empty_before, guest_before, 1) == 1
+        assert await carts.delete_stale(empty_before, guest_before, 10) == 1
+        assert await carts.delete_stale(empty_before, guest_before, 10) == 0
+        assert await carts.get("u2") and await carts.get("u3") and await carts.get("guest:b")
+        assert await carts.count_guests() == 1
+
+    run_storage(scenario)
+
+
+def test_orders(run_storage, order_document):
+    async def scenario(storage):
+        orders = storage.orders
+        for n in range(3):
+            await orders.insert(order_document(n))
+        await orders.insert(order_document(3, user_id="u2"))
+        with pytest.raises(DuplicateError):
+            await orders.insert(order_document(0))
+
+        assert [o["id"] for o in await orders.list_for_user("u1")] == ["o002", "o001", "o000"]
+        assert [o["id"] for o in await orders.list_for_user("u1", limit=1)] == ["o002"]
+        assert (await orders.get_for_user("o001", "u1"))["id"] == "o001"
+        assert await orders.get_for_user("o001", "u2") is None
+        assert "_id" not in await orders.find_by_id("o001")
+
+        await orders.set_status("o000", "pago", "pay-0")
+        order = await orders.find_by_id("o000")
+        assert (order["status"], order["payment_id"]) == ("pago", "pay-0")
+
+    run_storage(scenario)
+
+
+def test_order_transitions_are_guarded(run_storage, order_document):
+    async def scenario(storage):
+        orders = storage.orders
+        await orders.insert(order_document(1))
+        await orders.insert(order_document(2, status="cancelado"))
+
+        def transition(order_id, status, allowed_from):
+            return {"order_id": order_id, "status": status, "payment_id": "p", "allowed_from": allowed_from, "at": NOW}
+
+        applied = await orders.apply_transitions([
+            transition("o001", "pago", ["pendente", "erro"]),
+            transition("o001", "erro", ["pendente"]),  # já pago: ignorada
+            transition("o002", "pago", ["pendente", "erro"]),  # cancelado: ignorada
+            transition("o404", "pago", ["pendente"]),
+        ])
+        assert applied == 1
+        assert (await orders.find_by_id("o001"))["status"] == "pago"
+        assert (await orders.find_by_id("o002"))["status"] == "cancelado"
+        assert await orders.apply_transitions([]) == 0
+
+    run_storage(scenario)
+
+
+def test_order_search(run_storage, order_document):
+    async def scenario(storage):
+        orders = storage.orders
+        for n in range(10):
+            await orders.insert(order_document(n, status="pago" if n % 3 == 0 else "pendente", payment_id=f"pay-{n}"))
+
+        def ids(results):
+            return [o["id"] for o in results]
+
+        assert ids(await orders.search({}, limit=3)) == ["o009", "o008", "o007"]
+        assert ids(await orders.search({}, limit=3, ascending=True)) == ["o000", "o001", "o002"]
+        assert ids(await orders.search({"status": "pago"})) == ["o009", "o006", "o003", "o000"]
+        assert ids(await orders.search({"payment_type": "pix", "status": "pago"})) == ["o009", "o003"]
+        assert ids(await orders.search({"cpf": "52998224725"}, limit=2)) == ["o009", "o008"]
+        assert ids(await orders.search({"email": "maria0@example.com"}, limit=2)) == ["o008", "o006"]
+        assert ids(await orders.search({"payment_id": "pay-4"})) == ["o004"]
+        assert ids(await orders.search({"prefix": "maria1"}, limit=2)) == ["o009", "o007"]
+        assert ids(await orders.search({"prefix": "mar.a"})) == []
+        assert "search_terms" not in (await orders.search({}, limit=1))[0]
+
+        window = {"created_from": order_document(2)["created_at"], "created_to": order_document(5)["created_at"]}
+        assert ids(await orders.search(window)) == ["o004", "o003", "o002"]
+        # Datas com fuso (ex.: ?created_from=...Z) equivalem às datas UTC gravadas
+        aware = {k: v.replace(tzinfo=timezone.utc) for k, v in window.items()}
+        assert ids(await orders.search(aware)) == ["o004", "o003", "o002"]
+        brt = timezone(timedelta(hours=-3))
+        shifted = {k: v.replace(tzinfo=timezone.utc).astimezone(brt) for k, v in window.items()}
+        assert ids(await orders.search(shifted)) == ["o004", "o003", "o002"]
+
+        page = await orders.search({}, limit=4)
+        after = (page[-1]["created_at"], page[-1]["id"])
+        assert ids(await orders.search({}, limit=4, after=after)) == ["o005", "o004", "o003", "o002"]
+        after = (page[0]["created_at"], page[0]["id"])
+        assert ids(await orders.search({}, after=after, ascending=True)) == []
+
+    run_storage(scenario)
+
+
+def test_inventory(run_storage):
+    async def scenario(storage):
+        inventory = storage.inventory
+        assert await inventory.get_stock("camisa") is None
+        assert await inventory.reserve("camisa", 1) == UNTRACKED
+
+        await inventory.set_stock("camisa", 10, shards=3)
+        assert await inventory.get_stock("camisa") == 10
+        [(shard, quantity)] = await inventory.reserve("camisa", 3)
+        assert shard.startswith("camisa:") and quantity == 3
+        assert await inventory.get_stock("camisa") == 7
+        await inventory.release(shard, 3)
+        assert await inventory.get_stock("camisa") == 10
+
+        # Nenhum shard (4, 3, 3) tem 9 unidades: a reserva é dividida
+        lines = await inventory.reserve("camisa", 9)
+        assert len(lines) > 1 and sum(q for _, q in lines) == 9
+        assert await inventory.get_stock("camisa") == 1
+        assert await inventory.reserve("camisa", 2) is None
+        assert await inventory.get_stock("camisa") == 1
+
+        # Menos shards: devoluções ao shard removido vão para outro do produto
+        await inventory.set_stock("camisa", 0, shards=1)
+        for shard, quantity in lines:
+            await inventory.release(shard, quantity)
+        assert await inventory.get_stock("camisa") == 9
+
+        await inventory.set_stock("bone", 1)
+        assert await inventory.reserve("bone", 2) is None
+        assert await inventory.reserve("bone", 1) == [("bone:0", 1)]
+        assert await inventory.reserve("bone", 1) is None
+        assert await inventory.get_stock("bone") == 0
+
+    run_storage(scenario)
+
+
+def test_reservations(run_storage):
+    async def scenario(storage):
+        inventory = storage.inventory
+        lines = [{"product_id": "camisa", "shard_id": "camisa:0", "quantity": 1}]
+        await inventory.save_reservation({"_id": "o1", "lines": lines, "expires_at": NOW - timedelta(minutes=1)})
+        await inventory.save_reservation({"_id": "o2", "lines": lines, "expires_at": NOW - timedelta(minutes=1)})
+        await inventory.save_reservation({"_id": "o3", "lines": lines, "expires_at": NOW + timedelta(minutes=1)})
+        await inventory.complete_reservation("o2")
+
+        expired = await inventory.claim_expired(NOW)
+        assert (expired["_id"], expired["lines"]) == ("o1", lines)
+        assert await inventory.claim_expired(NOW) is None
+
+    run_storage(scenario)
+
+
+def test_webhook_events(run_storage):
+    async def scenario(storage):
+        events = storage.webhook_events
+
+        def event(event_id: str, provider: str, minutes: int) -> dict:
+            return {"_id": event_id, "provider": provider, "received_at": NOW + timedelta(minutes=minutes), "processed_at": None}
+
+        assert await events.insert(event("paypal:2", "paypal", 2))
+        assert await events.insert(event("paypal:1", "paypal", 1))
+        assert await events.insert(event("pagseguro:1", "pagseguro", 3))
+        assert not await events.insert(event("paypal:1", "paypal", 5))
+
+        assert [e["_id"] for e in await events.list_events()] == ["paypal:1", "paypal:2", "pagseguro:1"]
+        await events.mark_processed(["paypal:1"], NOW)
+        assert [e["_id"] for e in await events.list_events()] == ["paypal:2", "pagseguro:1"]
+        assert [e["_id"] for e in await events.list_events(provider="paypal")] == ["paypal:2"]
+        since = (NOW + timedelta(minutes=3)).replace(tzinfo=timezone.utc)
+        assert [e["_id"] for e in await events.list_events(since=since)] == ["pagseguro:1"]
+        assert len(await events.list_events(only_unprocessed=False, limit=2)) == 2
+
+    run_storage(scenario)
+
+
+def test_background_workers_use_overridden_repositories(client, storage):
+    from webhooks import webhook_processor
+    assert webhook_processor.orders is storage.orders
+    assert webhook_processor.events is storage.webhook_events
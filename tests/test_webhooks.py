@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+
+import httpx
+import pytest
+
+import webhooks
+from webhooks import apply_events
+
+SECRET = "segredo-webhook"
+
+
+def _parse_fake(payload: dict) -> dict:
+    return {
+        "event_id": payload.get("event_id"),
+        "order_id": payload.get("order_id"),
+        "payment_id": payload.get("payment_id"),
+        "status": payload.get("status"),
+    }
+
+
+@pytest.fixture
+def fake_provider(monkeypatch):
+    monkeypatch.setitem(webhooks.PROVIDERS, "fake", (webhooks._verify_hmac_body, _parse_fake))
+    monkeypatch.setitem(webhooks.WEBHOOK_SECRETS, "fake", SECRET)
+    monkeypatch.setitem(webhooks.WEBHOOK_SECRETS, "mercadopago", SECRET)
+
+
+def _signed(payload) -> dict:
+    body = json.dumps(payload).encode()
+    signature = hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return {"content": body, "headers": {"x-signature": f"sha256={signature}", "content-type": "application/json"}}
+
+
+def _signed_mercadopago(payload: dict, request_id: str = "req-1") -> dict:
+    manifest = f"id:{payload['data']['id']};request-id:{request_id};ts:1700000000;"
+    signature = hmac.new(SECRET.encode(), manifest.encode(), hashlib.sha256).hexdigest()
+    return {"x-signature": f"ts=1700000000,v1={signature}", "x-request-id": request_id}
+
+
+async def _insert_orders(storage, count: int):
+    for n in range(count):
+        await storage.orders.insert({"id": f"o{n}", "user_id": "u1", "status": "pendente", "payment_id": None})
+
+
+def _wait_processed(client, storage, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not client.portal.call(storage.webhook_events.list_events):
+            return
+        time.sleep(0.01)
+    raise AssertionError("notificações não processadas")
+
+
+def _status(client, storage, order_id: str) -> str:
+    return client.portal.call(storage.orders.find_by_id, order_id)["status"]
+
+
+def test_rejects_invalid_notifications(client, fake_provider):
+    payload = {"event_id": "e1", "order_id": "o1", "status": "pago"}
+    assert client.post("/api/webhooks/desconhecido", **_signed(payload)).status_code == 404
+    # Sem verificação por certificado, o PayPal não é aceito
+    assert client.post("/api/webhooks/paypal", **_signed(payload)).status_code == 404
+    assert client.post("/api/webhooks/fake", content=b"{nao e json", headers={"x-signature": "x"}).status_code == 400
+    assert client.post("/api/webhooks/fake", **_signed([payload])).status_code == 400
+    assert client.post("/api/webhooks/fake", **_signed("texto")).status_code == 400
+    assert client.post("/api/webhooks/mercadopago", **_signed({"id": 1, "data": "123"})).status_code == 400
+
+    tampered = _signed(payload)
+    tampered["content"] = json.dumps({**payload, "status": "cancelado"}).encode()
+    assert client.post("/api/webhooks/fake", **tampered).status_code == 401
+
+
+def test_duplicates_and_state_machine(client, storage, fake_provider):
+    client.portal.call(_insert_orders, storage, 2)
+
+    def send(event_id, order_id, status):
+        payload = {"event_id": event_id, "order_id": order_id, "payment_id": f"pay-{order_id}", "status": status}
+        return client.post("/api/webhooks/fake", **_signed(payload)).json()["message"]
+
+    assert send("e1", "o0", "pago") == "Notificação recebida"
+    assert send("e1", "o0", "pago") == "Notificação já recebida"
+    send("e2", "o1", "erro")
+    _wait_processed(client, storage)
+    send("e3", "o0", "erro")  # pago -> erro não é permitido
+    send("e4", "o1", "pago")  # erro -> pago é permitido
+    _wait_processed(client, storage)
+
+    assert _status(client, storage, "o0") == "pago"
+    assert _status(client, storage, "o1") == "pago"
+
+
+def test_mercadopago_status_comes_from_payment_lookup(storage, fake_provider, monkeypatch):
+    lookups = []
+
+    def lookup(payment_id):
+        lookups.append(payment_id)
+        if payment_id == "indisponivel":
+            raise webhooks.requests.ConnectionError("timeout")
+        return {"order_id": "o0", "status": "pago"}
+
+    monkeypatch.setitem(webhooks.PAYMENT_LOOKUPS, "mercadopago", lookup)
+
+    async def scenario():
+        await _insert_orders(storage, 1)
+        batch = []
+        for event_id, payment_id in ((1, "123"), (2, "indisponivel")):
+            # Formato real: sem pedido nem status, só o id do pagamento
+            payload = {"id": event_id, "type": "payment", "action": "payment.updated", "data": {"id": payment_id}}
+            body = json.dumps(payload).encode()
+            event = webhooks.build_event("mercadopago", _signed_mercadopago(payload), body, payload)
+            assert (event["order_id"], event["status"], event["payment_id"]) == (None, None, payment_id)
+            await storage.webhook_events.insert(event)
+            batch.append(event)
+
+        stats = {"applied": 0, "ignored": 0, "lookup_failures": 0, "batches": 0}
+        assert await apply_events(storage.orders, storage.webhook_events, batch, stats) == 1
+        assert stats["lookup_failures"] == 1
+        # A falha de consulta fica pendente para o replay
+        assert [e["_id"] for e in await storage.webhook_events.list_events()] == ["mercadopago:2"]
+        order = await storage.orders.find_by_id("o0")
+        assert (order["status"], order["payment_id"]) == ("pago", "123")
+
+    asyncio.run(scenario())
+    assert lookups == ["123", "indisponivel"]
+
+
+def test_webhook_ingestion_benchmark(client, storage, fake_provider):
+    """Vazão do endpoint com um provedor falso e número de lotes aplicados"""
+    notifications = 2000
+    client.portal.call(_insert_orders, storage, notifications)
+    batches_before = webhooks.webhook_processor.stats["batches"]
+    requests = [
+        _signed({"event_id": f"e{n}", "order_id": f"o{n}", "payment_id": f"pay-{n}", "status": "pago"})
+        for n in range(notifications)
+    ]
+
+    async def send_all():
+        # Entregas concorrentes, como o provedor faz em rajadas
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            responses = await asyncio.gather(*(http.post("/api/webhooks/fake", **r) for r in requests))
+        return [response.status_code for response in responses]
+
+    started = time.perf_counter()
+    assert client.portal.call(send_all) == [200] * notifications
+    acked = time.perf_counter() - started
+    _wait_processed(client, storage)
+    total = time.perf_counter() - started
+
+    batches = webhooks.webhook_processor.stats["batches"] - batches_before
+    print(
+        f"\n{notifications} notificações: {notifications / acked:.0f}/s confirmadas, "
+        f"{notifications / total:.0f}/s aplicadas, {batches} lotes"
+    )
+    assert sum(_status(client, storage, f"o{n}") == "pago" for n in range(notifications)) == notifications
+    assert batches < notifications / 10